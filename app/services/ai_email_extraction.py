@@ -1,14 +1,71 @@
 import os
-import json
-import re
-from openai import OpenAI
-from dotenv import load_dotenv
+import logging
+import orjson
+from functools import lru_cache
+from typing import Iterator, Optional
+from openai import OpenAI, Timeout, RateLimitError, APIConnectionError, APITimeoutError
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential_jitter,
+    before_sleep_log
+)
 
+logger = logging.getLogger(__name__)
 
-# Load environment variables (if using .env file)
-print(f"🔄 Loading environment variables from .env file...")
-env_loaded = load_dotenv()
-print(f"📋 Environment loaded: {env_loaded}")
+
+def _next_opening_bracket(s: str, pos: int) -> int:
+    """Index of the next '{' or '[' at or after pos, or -1."""
+    brace = s.find('{', pos)
+    bracket = s.find('[', pos)
+    if brace == -1 or bracket == -1:
+        return max(brace, bracket)
+    return min(brace, bracket)
+
+
+def _iter_json_candidates(s: str) -> Iterator[str]:
+    """
+    Yield each balanced JSON object/array in a string, in order of its
+    opening bracket.
+
+    Each candidate is found with a single forward walk that tracks bracket
+    depth and string/escape state, so malformed responses can't trigger
+    regex backtracking. If a candidate is not valid JSON, the caller simply
+    asks for the next one, which starts at the following opening bracket.
+
+    Args:
+        s (str): Text that may contain a JSON object or array
+
+    Yields:
+        str: Balanced slices starting with '{' or '['
+    """
+    start = _next_opening_bracket(s, 0)
+    while start != -1:
+        depth = 0
+        in_string = False
+        escape = False
+
+        for i in range(start, len(s)):
+            ch = s[i]
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == '\\':
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == '{' or ch == '[':
+                depth += 1
+            elif ch == '}' or ch == ']':
+                depth -= 1
+                if depth == 0:
+                    yield s[start:i + 1]
+                    break
+
+        start = _next_opening_bracket(s, start + 1)
 
 
 def extract_json_from_response(response_text: str) -> dict:
@@ -21,38 +78,103 @@ def extract_json_from_response(response_text: str) -> dict:
     """
     # Try parsing directly first
     try:
-        return json.loads(response_text)
-    except json.JSONDecodeError:
+        return orjson.loads(response_text)
+    except orjson.JSONDecodeError:
         pass
     
-    # Remove markdown code blocks with language specifier
-    # Pattern: `````` or ``````
-    markdown_pattern = r'``````'
-    matches = re.findall(markdown_pattern, response_text, re.DOTALL)
-    
-    if matches:
-        # Try parsing the content inside code blocks
-        for match in matches:
-            try:
-                return json.loads(match.strip())
-            except json.JSONDecodeError:
-                continue
-    
-    # Try to extract JSON object/array using regex
-    # Look for {...} or [...]
-    json_pattern = r'(\{(?:[^{}]|(?:\{[^{}]*\}))*\}|\[(?:[^\[\]]|(?:\[[^\[\]]*\]))*\])'
-    json_matches = re.findall(json_pattern, response_text, re.DOTALL)
-    
-    for match in json_matches:
+    # Try each balanced {...} or [...] in turn (also covers code blocks)
+    for candidate in _iter_json_candidates(response_text):
         try:
-            return json.loads(match)
-        except json.JSONDecodeError:
+            return orjson.loads(candidate)
+        except orjson.JSONDecodeError:
             continue
     
     # If nothing works, raise an error
     raise ValueError(f"Could not extract valid JSON from response: {response_text[:200]}...")
 
 
+@lru_cache(maxsize=None)
+def _get_openai_client(api_key: str) -> OpenAI:
+    """
+    Get a shared OpenAI client for the given API key.
+
+    The client (and its pooled HTTP connections) is created once per key and
+    reused across calls and monitoring threads instead of per email.
+
+    Args:
+        api_key (str): OpenAI API key
+
+    Returns:
+        OpenAI: Shared OpenAI client
+    """
+    return OpenAI(
+        api_key=api_key,
+        max_retries=0,  # Retries are handled by _request_completion
+        timeout=Timeout(60.0, connect=5.0)
+    )
+
+
+_backoff = wait_exponential_jitter(initial=1, max=30)
+
+
+def _wait_retry_after(retry_state) -> float:
+    """
+    Wait for the server's Retry-After hint when present, otherwise back off
+    exponentially with jitter.
+    """
+    exception = retry_state.outcome.exception()
+    response = getattr(exception, 'response', None)
+    if response is not None:
+        try:
+            return min(float(response.headers.get('retry-after')), 60.0)
+        except (TypeError, ValueError):
+            pass
+    return _backoff(retry_state)
+
+
+@retry(
+    retry=retry_if_exception_type((RateLimitError, APIConnectionError, APITimeoutError)),
+    wait=_wait_retry_after,
+    stop=stop_after_attempt(5),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True
+)
+def _request_completion(client: OpenAI, prompt: str) -> str:
+    """
+    Stream a JSON-mode chat completion and return the full response text.
+    
+    Retried on rate limits and transient connection errors; each attempt
+    starts a fresh stream.
+    
+    Args:
+        client (OpenAI): OpenAI client
+        prompt (str): User prompt
+        
+    Returns:
+        str: Raw response text
+    """
+    chunks = []
+
+    response = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "You are a JSON generator. Always respond with valid JSON only. Never include markdown formatting or additional text."},
+            {"role": "user", "content": prompt}
+        ],
+        response_format={"type": "json_object"},  # Enable JSON mode
+        temperature=0,
+        stream=True
+    )
+    for chunk in response:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            chunks.append(delta)
+
+    return "".join(chunks)
+
+
 def extract_hardware_quotation_details(email_content: str):
     """
     Single AI call that validates email and extracts quotation data if valid.
@@ -63,15 +185,13 @@ def extract_hardware_quotation_details(email_content: str):
     # Initialize OpenAI client
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
-        print("❌ OPENAI_API_KEY not found in environment variables")
+        logger.error("OPENAI_API_KEY not found in environment variables")
         raise ValueError("OPENAI_API_KEY not found in environment variables")
     
-    print(f"🔑 OpenAI API key found (length: {len(api_key)})")
     try:
-        client = OpenAI(api_key=api_key)
-        print(f"✅ OpenAI client initialized successfully")
+        client = _get_openai_client(api_key)
     except Exception as e:
-        print(f"❌ Failed to initialize OpenAI client: {str(e)}")
+        logger.error(f"Failed to initialize OpenAI client: {str(e)}")
         raise Exception(f"Failed to initialize OpenAI client: {str(e)}")
 
     # Create unified prompt for validation + extraction
@@ -121,25 +241,16 @@ EMAIL CONTENT:
 RESPONSE (MUST be valid JSON only, no additional text):"""
 
     # Make API call with JSON mode enabled for guaranteed JSON output
-    print(f"🔄 Making OpenAI API call with JSON mode...")
+    logger.debug("Making OpenAI API call with JSON mode")
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a JSON generator. Always respond with valid JSON only. Never include markdown formatting or additional text."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},  # Enable JSON mode
-            temperature=0
-        )
-        print(f"✅ OpenAI API call completed successfully")
+        response_text = _request_completion(client, prompt).strip()
+        logger.debug("OpenAI API call completed successfully")
     except Exception as e:
-        print(f"❌ OpenAI API call failed: {str(e)}")
+        logger.error(f"OpenAI API call failed: {str(e)}")
         raise e
 
-    # Extract the response text
-    response_text = response.choices[0].message.content.strip()
-    print(f"📄 Raw API response: {response_text[:200]}{'...' if len(response_text) > 200 else ''}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Raw API response: {response_text[:200]}{'...' if len(response_text) > 200 else ''}")
 
     # Parse JSON from response (handles markdown, code blocks, etc.)
     try:
@@ -151,14 +262,19 @@ RESPONSE (MUST be valid JSON only, no additional text):"""
         
         return parsed_data
         
-    except (json.JSONDecodeError, ValueError) as e:
-        print(f"⚠️ Failed to parse JSON from response: {str(e)}")
-        print(f"Raw response: {response_text}")
+    except ValueError as e:
+        logger.warning(f"Failed to parse JSON from response: {str(e)}")
+        logger.debug(f"Raw response: {response_text}")
         return {"status": "ERROR", "reason": "Failed to parse response", "raw_response": response_text}
 
 
 # Example usage - Single API call handles both validation and extraction
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    # Load environment variables (if using .env file)
+    load_dotenv()
+
     # Example 1: Valid quotation request (should return JSON with structured requirements)
     valid_email = """
     Dear Supplier,
@@ -192,8 +308,8 @@ if __name__ == "__main__":
 
     print("=== Testing Valid Email (Single API Call) ===")
     valid_result = extract_hardware_quotation_details(valid_email)
-    print(json.dumps(valid_result, indent=2))
+    print(orjson.dumps(valid_result, option=orjson.OPT_INDENT_2).decode())
     
     print("\n=== Testing Invalid Email (Single API Call) ===")
     invalid_result = extract_hardware_quotation_details(invalid_email)
-    print(json.dumps(invalid_result, indent=2))
+    print(orjson.dumps(invalid_result, option=orjson.OPT_INDENT_2).decode())
@@ -6,28 +6,179 @@ AI extraction results and managing email processing data.
 """
 
 import duckdb
-import json
 import logging
+import orjson
 import os
+import pandas as pd
+import threading
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 
 logger = logging.getLogger(__name__)
 
+# One open database per file for the whole process; services work on cursors of it
+_databases: Dict[str, duckdb.DuckDBPyConnection] = {}
+_databases_lock = threading.Lock()
+
+# Extraction counts per database. DuckDB has no triggers, so every write made
+# through DuckDBService drops the entry and bumps the generation instead.
+_stats_cache: Dict[str, Dict] = {}
+_stats_generation: Dict[str, int] = {}
+_stats_lock = threading.Lock()
+
+
+def _get_database(db_path: str, threads: int, memory_limit: str) -> duckdb.DuckDBPyConnection:
+    """
+    Get the shared DuckDB connection for a database file, opening it on first use.
+    
+    Args:
+        db_path (str): Path to DuckDB database file
+        threads (int): Worker threads, applied when the database is first opened
+        memory_limit (str): Memory cap, applied when the database is first opened
+        
+    Returns:
+        duckdb.DuckDBPyConnection: Process-wide connection for db_path
+    """
+    with _databases_lock:
+        database = _databases.get(db_path)
+        if database is None:
+            database = duckdb.connect(db_path, config={
+                'threads': threads,
+                'memory_limit': memory_limit,
+            })
+            _databases[db_path] = database
+            logger.info(f"DuckDB database opened: {db_path}")
+        return database
+
+# SQL statements, defined once and reused by name
+# Schema state probe: (table exists, id sequence exists)
+_SQL_SCHEMA_STATE = '''
+    SELECT
+        (SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'email_extractions') > 0,
+        (SELECT COUNT(*) FROM duckdb_sequences() WHERE sequence_name = 'email_extractions_id_seq') > 0
+'''
+
+# DDL cannot take bound parameters, so the start value is formatted in as an int
+_SQL_CREATE_SEQUENCE = 'CREATE SEQUENCE IF NOT EXISTS email_extractions_id_seq START {start:d}'
+
+_SQL_SET_ID_DEFAULT = '''
+    ALTER TABLE email_extractions ALTER COLUMN id SET DEFAULT nextval('email_extractions_id_seq')
+'''
+
+_SQL_CREATE_TABLE = '''
+    CREATE TABLE IF NOT EXISTS email_extractions (
+        id INTEGER PRIMARY KEY DEFAULT nextval('email_extractions_id_seq'),
+        gmail_id VARCHAR UNIQUE NOT NULL,
+        subject VARCHAR,
+        sender VARCHAR,
+        received_at TIMESTAMP,
+        extraction_status VARCHAR, -- 'VALID' or 'IRRELEVANT'
+        extraction_result JSON,
+        processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# The UNIQUE constraint on gmail_id already maintains an index; this one only duplicated it
+_SQL_DROP_REDUNDANT_INDEX = 'DROP INDEX IF EXISTS idx_gmail_id'
+
+_SQL_MAX_ID = 'SELECT COALESCE(MAX(id), 0) FROM email_extractions'
+
+# Insert-or-update keyed on gmail_id.
+# New rows take their id from the column default, existing rows keep theirs.
+_SQL_UPSERT = '''
+    INSERT INTO email_extractions (
+        gmail_id, subject, sender, received_at, extraction_status, extraction_result
+    ) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (gmail_id) DO UPDATE SET
+        extraction_status = excluded.extraction_status,
+        extraction_result = excluded.extraction_result,
+        updated_at = now()
+    RETURNING id
+'''
+
+# Bulk variant reading from a DataFrame registered on the connection as 'staged_extractions'
+_SQL_UPSERT_STAGED = '''
+    INSERT INTO email_extractions (
+        gmail_id, subject, sender, received_at, extraction_status, extraction_result
+    )
+    SELECT gmail_id, subject, sender, received_at::TIMESTAMP, extraction_status, extraction_result::JSON
+    FROM staged_extractions
+    ON CONFLICT (gmail_id) DO UPDATE SET
+        extraction_status = excluded.extraction_status,
+        extraction_result = excluded.extraction_result,
+        updated_at = now()
+    RETURNING id
+'''
+
+_STAGED_COLUMNS = ['gmail_id', 'subject', 'sender', 'received_at', 'extraction_status', 'extraction_result']
+
+_SQL_UPDATE = '''
+    UPDATE email_extractions
+    SET extraction_status = ?, extraction_result = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE gmail_id = ?
+    RETURNING id
+'''
+
+# DuckDB reports the affected row count as the result of a DELETE
+_SQL_CLEAR = 'DELETE FROM email_extractions'
+
+_SQL_SELECT_BY_GMAIL_ID = '''
+    SELECT id, gmail_id, subject, sender, received_at,
+           extraction_status, extraction_result, processed_at, updated_at
+    FROM email_extractions
+    WHERE gmail_id = ?
+'''
+
+# Listing query; {result} is the full JSON blob or a summary projection, {where}
+# is filled from the fixed predicates below
+_SQL_SELECT_LIST = '''
+    SELECT id, gmail_id, subject, sender, received_at,
+           extraction_status, {result}, processed_at, updated_at
+    FROM email_extractions
+    {where}
+    ORDER BY processed_at DESC, id DESC
+    LIMIT ?
+'''
+
+_SQL_RESULT_FULL = 'extraction_result'
+
+# Computed inside DuckDB so the blob never crosses into Python
+_SQL_RESULT_SUMMARY = "json_array_length(extraction_result, '$.Requirements') AS requirement_count"
+
+# Keyset page: rows strictly older than the (processed_at, id) cursor
+_SQL_WHERE_BEFORE = '(processed_at, id) < (?::TIMESTAMP, ?)'
+
+_SQL_WHERE_STATUS = 'extraction_status = ?'
+
+_SQL_COUNT = 'SELECT COUNT(*) FROM email_extractions'
+
+_SQL_STATS = '''
+    SELECT COUNT(*),
+           COUNT(*) FILTER (WHERE extraction_status = 'VALID'),
+           COUNT(*) FILTER (WHERE extraction_status = 'IRRELEVANT')
+    FROM email_extractions
+'''
+
 class DuckDBService:
     """
     Service class for handling DuckDB operations.
     """
     
-    def __init__(self, db_path: str = "database/snapquote.duckdb"):
+    def __init__(self, db_path: str = "database/snapquote.duckdb",
+                 threads: Optional[int] = None, memory_limit: Optional[str] = None):
         """
         Initialize DuckDB service with database path.
         
         Args:
             db_path (str): Path to DuckDB database file
+            threads (Optional[int]): Worker threads for DuckDB (defaults to DUCKDB_THREADS env var)
+            memory_limit (Optional[str]): Memory cap such as '512MB' (defaults to DUCKDB_MEMORY_LIMIT env var)
         """
         self.db_path = db_path
         self.connection = None
+        self.threads = threads or int(os.environ.get('DUCKDB_THREADS', '2'))
+        self.memory_limit = memory_limit or os.environ.get('DUCKDB_MEMORY_LIMIT', '512MB')
         
         # Ensure database directory exists
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
@@ -38,12 +189,15 @@ class DuckDBService:
         """
         Establish connection to DuckDB database.
         
+        Each service gets its own cursor on the shared database, so
+        concurrent requests run in parallel without reopening the file.
+        
         Returns:
             bool: True if connection successful
         """
         try:
-            self.connection = duckdb.connect(self.db_path)
-            logger.info("DuckDB connection established")
+            self.connection = _get_database(self.db_path, self.threads, self.memory_limit).cursor()
+            logger.debug("DuckDB connection established")
             return True
         except Exception as e:
             logger.error(f"DuckDB connection failed: {str(e)}")
@@ -52,16 +206,29 @@ class DuckDBService:
     def disconnect(self):
         """
         Close database connection.
+        
+        Only this service's cursor is closed; the shared database stays open.
         """
         if self.connection:
             self.connection.close()
             self.connection = None
-            logger.info("DuckDB connection closed")
+            logger.debug("DuckDB connection closed")
+    
+    def _invalidate_stats(self):
+        """
+        Drop the cached extraction counts for this database after a write.
+        """
+        with _stats_lock:
+            _stats_cache.pop(self.db_path, None)
+            _stats_generation[self.db_path] = _stats_generation.get(self.db_path, 0) + 1
     
     def create_table(self) -> bool:
         """
         Create the email_extractions table.
         
+        All schema statements run in one transaction, so a failed migration
+        leaves the previous schema untouched.
+        
         Returns:
             bool: True if table created successfully
         """
@@ -70,87 +237,128 @@ class DuckDBService:
             return False
         
         try:
-            self.connection.execute('''
-                CREATE TABLE IF NOT EXISTS email_extractions (
-                    id INTEGER PRIMARY KEY,
-                    gmail_id VARCHAR UNIQUE NOT NULL,
-                    subject VARCHAR,
-                    sender VARCHAR,
-                    received_at TIMESTAMP,
-                    extraction_status VARCHAR, -- 'VALID' or 'IRRELEVANT'
-                    extraction_result JSON,
-                    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create index for faster lookups
-            self.connection.execute('''
-                CREATE INDEX IF NOT EXISTS idx_gmail_id ON email_extractions (gmail_id)
-            ''')
+            self.connection.begin()
+            
+            table_exists, sequence_exists = self.connection.execute(_SQL_SCHEMA_STATE).fetchone()
+            
+            # Seed the id sequence past any rows written before it existed
+            start = 1
+            if table_exists and not sequence_exists:
+                start = self.connection.execute(_SQL_MAX_ID).fetchone()[0] + 1
+            self.connection.execute(_SQL_CREATE_SEQUENCE.format(start=start))
+            
+            self.connection.execute(_SQL_CREATE_TABLE)
+            
+            # Remove the duplicate gmail_id index left by older schema versions
+            self.connection.execute(_SQL_DROP_REDUNDANT_INDEX)
+            
+            # Older tables were created without an id default
+            if table_exists and not sequence_exists:
+                self.connection.execute(_SQL_SET_ID_DEFAULT)
+            
+            self.connection.commit()
             
             logger.info("DuckDB table created successfully")
             return True
             
         except Exception as e:
             logger.error(f"Error creating DuckDB table: {str(e)}")
+            try:
+                self.connection.rollback()
+            except Exception:
+                pass
             return False
     
     def insert_extraction(self, email_data: Dict, extraction_result: Dict) -> Optional[int]:
         """
-        Insert a new email extraction record.
+        Insert an email extraction record, or update it if the gmail_id is already stored.
         
         Args:
             email_data (Dict): Email metadata
             extraction_result (Dict): AI extraction result
             
         Returns:
-            Optional[int]: Record ID if inserted successfully, None otherwise
+            Optional[int]: Record ID if saved successfully, None otherwise
         """
         if not self.connection:
             logger.error("No DuckDB connection available")
             return None
         
         try:
-            # Check if record with this gmail_id already exists
-            existing = self.connection.execute(
-                'SELECT id FROM email_extractions WHERE gmail_id = ?', 
-                (email_data.get('gmail_id'),)
-            ).fetchone()
-            
-            if existing:
-                logger.info(f"Email with gmail_id {email_data.get('gmail_id')} already exists, updating instead")
-                success = self.update_extraction(email_data.get('gmail_id'), extraction_result)
-                return existing[0] if success else None
-            
             # Determine extraction status
             status = "IRRELEVANT" if extraction_result.get("status") == "NOT_VALID" else "VALID"
             
-            # Generate a simple ID based on current max ID + 1
-            max_id_result = self.connection.execute('SELECT COALESCE(MAX(id), 0) FROM email_extractions').fetchone()
-            next_id = (max_id_result[0] if max_id_result else 0) + 1
-            
-            self.connection.execute('''
-                INSERT INTO email_extractions (
-                    id, gmail_id, subject, sender, received_at, extraction_status, extraction_result
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                next_id,
+            record_id = self.connection.execute(_SQL_UPSERT, (
                 email_data.get('gmail_id'),
                 email_data.get('subject'),
                 email_data.get('sender'),
                 email_data.get('received_at'),
                 status,
-                json.dumps(extraction_result)
-            ))
+                orjson.dumps(extraction_result).decode()
+            )).fetchone()[0]
             
-            logger.info(f"Email extraction inserted with ID: {next_id}")
-            return next_id
+            self._invalidate_stats()
+            logger.info(f"Email extraction saved with ID: {record_id}")
+            return record_id
             
         except Exception as e:
             logger.error(f"Error inserting email extraction: {str(e)}")
             return None
     
+    def insert_extractions(self, records: List[Tuple[Dict, Dict]]) -> List[int]:
+        """
+        Insert or update several email extraction records with a single statement.
+        
+        Rows are staged in a DataFrame that DuckDB scans column-wise, rather
+        than being bound one parameter at a time.
+        
+        Args:
+            records (List[Tuple[Dict, Dict]]): (email_data, extraction_result) pairs
+            
+        Returns:
+            List[int]: Record IDs saved, empty list if the batch failed
+        """
+        if not self.connection:
+            logger.error("No DuckDB connection available")
+            return []
+        
+        if not records:
+            return []
+        
+        try:
+            # One row per gmail_id; a statement may not touch the same conflict key twice
+            unique_records = {}
+            for email_data, extraction_result in records:
+                unique_records[email_data.get('gmail_id')] = (email_data, extraction_result)
+            
+            rows = []
+            for gmail_id, (email_data, extraction_result) in unique_records.items():
+                status = "IRRELEVANT" if extraction_result.get("status") == "NOT_VALID" else "VALID"
+                rows.append((
+                    gmail_id,
+                    email_data.get('subject'),
+                    email_data.get('sender'),
+                    email_data.get('received_at'),
+                    status,
+                    orjson.dumps(extraction_result).decode()
+                ))
+            
+            staged = pd.DataFrame(rows, columns=_STAGED_COLUMNS, dtype=object)
+            self.connection.register('staged_extractions', staged)
+            try:
+                results = self.connection.execute(_SQL_UPSERT_STAGED).fetchall()
+            finally:
+                self.connection.unregister('staged_extractions')
+            
+            record_ids = [result[0] for result in results]
+            self._invalidate_stats()
+            logger.info(f"Saved {len(record_ids)} email extractions in one batch")
+            return record_ids
+            
+        except Exception as e:
+            logger.error(f"Error saving email extraction batch: {str(e)}")
+            return []
+    
     def update_extraction(self, gmail_id: str, extraction_result: Dict) -> bool:
         """
         Update an existing email extraction record.
@@ -160,7 +368,7 @@ class DuckDBService:
             extraction_result (Dict): New AI extraction result
             
         Returns:
-            bool: True if updated successfully
+            bool: True if a record was updated, False if none matched or on error
         """
         if not self.connection:
             logger.error("No DuckDB connection available")
@@ -169,12 +377,15 @@ class DuckDBService:
         try:
             status = "IRRELEVANT" if extraction_result.get("status") == "NOT_VALID" else "VALID"
             
-            self.connection.execute('''
-                UPDATE email_extractions 
-                SET extraction_status = ?, extraction_result = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE gmail_id = ?
-            ''', (status, json.dumps(extraction_result), gmail_id))
+            updated = self.connection.execute(
+                _SQL_UPDATE, (status, orjson.dumps(extraction_result).decode(), gmail_id)
+            ).fetchone()
+            
+            if not updated:
+                logger.warning(f"No email extraction found to update for gmail_id: {gmail_id}")
+                return False
             
+            self._invalidate_stats()
             logger.info(f"Email extraction updated for gmail_id: {gmail_id}")
             return True
             
@@ -182,6 +393,27 @@ class DuckDBService:
             logger.error(f"Error updating email extraction: {str(e)}")
             return False
     
+    def clear_extractions(self) -> Optional[int]:
+        """
+        Delete every email extraction record.
+        
+        Returns:
+            Optional[int]: Number of records deleted, None on error
+        """
+        if not self.connection:
+            logger.error("No DuckDB connection available")
+            return None
+        
+        try:
+            deleted = self.connection.execute(_SQL_CLEAR).fetchone()[0]
+            self._invalidate_stats()
+            logger.info(f"Deleted {deleted} email extractions")
+            return deleted
+            
+        except Exception as e:
+            logger.error(f"Error clearing email extractions: {str(e)}")
+            return None
+    
     def get_extraction(self, gmail_id: str) -> Optional[Dict]:
         """
         Get extraction record by Gmail ID.
@@ -197,12 +429,7 @@ class DuckDBService:
             return None
         
         try:
-            result = self.connection.execute('''
-                SELECT id, gmail_id, subject, sender, received_at, 
-                       extraction_status, extraction_result, processed_at, updated_at
-                FROM email_extractions 
-                WHERE gmail_id = ?
-            ''', (gmail_id,)).fetchone()
+            result = self.connection.execute(_SQL_SELECT_BY_GMAIL_ID, (gmail_id,)).fetchone()
             
             if result:
                 return {
@@ -212,7 +439,7 @@ class DuckDBService:
                     'sender': result[3],
                     'received_at': result[4],
                     'extraction_status': result[5],
-                    'extraction_result': json.loads(result[6]),
+                    'extraction_result': orjson.loads(result[6]),
                     'processed_at': result[7],
                     'updated_at': result[8]
                 }
@@ -222,12 +449,170 @@ class DuckDBService:
             logger.error(f"Error retrieving email extraction: {str(e)}")
             return None
     
-    def get_all_extractions(self, limit: int = 100) -> List[Dict]:
+    def count_extractions(self) -> Optional[int]:
         """
-        Get all extraction records with pagination.
+        Count stored email extraction records.
+        
+        Returns:
+            Optional[int]: Number of records, None on error
+        """
+        if not self.connection:
+            logger.error("No DuckDB connection available")
+            return None
+        
+        try:
+            return self.connection.execute(_SQL_COUNT).fetchone()[0]
+            
+        except Exception as e:
+            logger.error(f"Error counting email extractions: {str(e)}")
+            return None
+    
+    def get_stats(self) -> Optional[Dict]:
+        """
+        Get extraction counts, scanning the table only when a write has
+        invalidated the cached values.
+        
+        Returns:
+            Optional[Dict]: total, valid and irrelevant counts, None on error
+        """
+        if not self.connection:
+            logger.error("No DuckDB connection available")
+            return None
+        
+        with _stats_lock:
+            cached = _stats_cache.get(self.db_path)
+            generation = _stats_generation.get(self.db_path, 0)
+        if cached is not None:
+            return dict(cached)
+        
+        try:
+            total, valid, irrelevant = self.connection.execute(_SQL_STATS).fetchone()
+            stats = {
+                'total_emails': total,
+                'valid_quotations': valid,
+                'irrelevant_emails': irrelevant
+            }
+            
+            # Only cache if no write landed while the counts were being computed
+            with _stats_lock:
+                if _stats_generation.get(self.db_path, 0) == generation:
+                    _stats_cache[self.db_path] = stats
+            
+            return dict(stats)
+            
+        except Exception as e:
+            logger.error(f"Error retrieving extraction stats: {str(e)}")
+            return None
+    
+    @staticmethod
+    def make_cursor(record: Dict) -> str:
+        """
+        Build the keyset cursor that continues after the given record.
+        
+        Args:
+            record (Dict): Last extraction record of a page
+            
+        Returns:
+            str: Cursor string to pass as ``before`` for the next page
+        """
+        processed_at = record['processed_at']
+        if isinstance(processed_at, datetime):
+            processed_at = processed_at.isoformat()
+        return f"{processed_at}|{record['id']}"
+    
+    @staticmethod
+    def parse_cursor(cursor: str) -> Optional[Tuple[str, int]]:
+        """
+        Split a cursor from make_cursor() into its keyset values.
+        
+        Args:
+            cursor (str): Cursor string passed as ``before``
+            
+        Returns:
+            Optional[Tuple[str, int]]: (processed_at, id), or None if the cursor is malformed
+        """
+        processed_at, separator, record_id = cursor.rpartition('|')
+        if not separator:
+            return None
+        try:
+            datetime.fromisoformat(processed_at)
+            return processed_at, int(record_id)
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _build_list_query(limit: int, before: Optional[str], status: Optional[str],
+                          include_result: bool) -> Tuple[str, List]:
+        """
+        Assemble the listing SQL and its parameters from the fixed fragments.
+        
+        Args:
+            limit (int): Maximum number of records to return
+            before (Optional[str]): Cursor from make_cursor()
+            status (Optional[str]): extraction_status filter
+            include_result (bool): Select the JSON blob rather than the summary column
+            
+        Returns:
+            Tuple[str, List]: SQL text and bound parameters
+        """
+        predicates = []
+        params = []
+        if status:
+            predicates.append(_SQL_WHERE_STATUS)
+            params.append(status)
+        if before:
+            keyset = DuckDBService.parse_cursor(before)
+            if keyset is None:
+                raise ValueError(f"Invalid cursor: {before}")
+            predicates.append(_SQL_WHERE_BEFORE)
+            params.extend(keyset)
+        params.append(limit)
+        
+        where = f"WHERE {' AND '.join(predicates)}" if predicates else ''
+        result_column = _SQL_RESULT_FULL if include_result else _SQL_RESULT_SUMMARY
+        return _SQL_SELECT_LIST.format(result=result_column, where=where), params
+    
+    def get_all_extractions_df(self, limit: int = 100, before: Optional[str] = None,
+                               status: Optional[str] = None,
+                               include_result: bool = True) -> Optional[pd.DataFrame]:
+        """
+        Get extraction records as a DataFrame, materialised column-wise by DuckDB.
+        
+        Intended for exports and bulk consumers; extraction_result stays as
+        raw JSON text instead of being parsed per row.
+        
+        Args:
+            limit (int): Maximum number of records to return
+            before (Optional[str]): Cursor from make_cursor(); only older records are returned
+            status (Optional[str]): Only return records with this extraction_status
+            include_result (bool): If False, return requirement_count instead of extraction_result
+            
+        Returns:
+            Optional[pd.DataFrame]: Extraction records, None on error
+        """
+        if not self.connection:
+            logger.error("No DuckDB connection available")
+            return None
+        
+        try:
+            sql, params = self._build_list_query(limit, before, status, include_result)
+            return self.connection.execute(sql, params).df()
+            
+        except Exception as e:
+            logger.error(f"Error retrieving email extractions: {str(e)}")
+            return None
+    
+    def get_all_extractions(self, limit: int = 100, before: Optional[str] = None,
+                            status: Optional[str] = None, include_result: bool = True) -> List[Dict]:
+        """
+        Get all extraction records with keyset pagination.
         
         Args:
             limit (int): Maximum number of records to return
+            before (Optional[str]): Cursor from make_cursor(); only older records are returned
+            status (Optional[str]): Only return records with this extraction_status
+            include_result (bool): If False, return 'requirement_count' instead of the
+                parsed extraction_result
             
         Returns:
             List[Dict]: List of extraction records
@@ -237,29 +622,33 @@ class DuckDBService:
             return []
         
         try:
-            results = self.connection.execute('''
-                SELECT id, gmail_id, subject, sender, received_at, 
-                       extraction_status, extraction_result, processed_at, updated_at
-                FROM email_extractions 
-                ORDER BY processed_at DESC
-                LIMIT ?
-            ''', (limit,)).fetchall()
-            
-            extractions = []
-            for result in results:
-                extractions.append({
-                    'id': result[0],
-                    'gmail_id': result[1],
-                    'subject': result[2],
-                    'sender': result[3],
-                    'received_at': result[4],
-                    'extraction_status': result[5],
-                    'extraction_result': json.loads(result[6]),
-                    'processed_at': result[7],
-                    'updated_at': result[8]
-                })
+            sql, params = self._build_list_query(limit, before, status, include_result)
+            results = self.connection.execute(sql, params).fetchall()
+            
+            if include_result:
+                return [{
+                    'id': r[0],
+                    'gmail_id': r[1],
+                    'subject': r[2],
+                    'sender': r[3],
+                    'received_at': r[4],
+                    'extraction_status': r[5],
+                    'extraction_result': orjson.loads(r[6]),
+                    'processed_at': r[7],
+                    'updated_at': r[8]
+                } for r in results]
             
-            return extractions
+            return [{
+                'id': r[0],
+                'gmail_id': r[1],
+                'subject': r[2],
+                'sender': r[3],
+                'received_at': r[4],
+                'extraction_status': r[5],
+                'requirement_count': r[6] or 0,
+                'processed_at': r[7],
+                'updated_at': r[8]
+            } for r in results]
             
         except Exception as e:
             logger.error(f"Error retrieving email extractions: {str(e)}")
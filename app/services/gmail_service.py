@@ -11,13 +11,13 @@ from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 import threading
 import time
-import json
+from collections import OrderedDict
+import orjson
 import os
 import base64
 import email
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-import json
 
 # Gmail API imports
 from google.auth.transport.requests import Request
@@ -31,10 +31,34 @@ from app.services.ai_email_extraction import extract_hardware_quotation_details
 from app.services.duckdb_service import DuckDBService
 
 # File processing utilities
-from utils import process_attachment
+from utils import process_attachments
 
 logger = logging.getLogger(__name__)
 
+# Gmail watches expire after 7 days; renew a day early
+WATCH_RENEW_SECONDS = 6 * 24 * 3600
+
+# Delay before retrying a watch registration or renewal that failed
+WATCH_RETRY_SECONDS = 300
+
+# While push notifications are active, poll only as a safety net for dropped notifications
+PUSH_FALLBACK_INTERVAL = 3600
+
+# Retries for rate-limited (429) and transient 5xx Gmail API responses, with exponential backoff
+API_NUM_RETRIES = 5
+
+# Maximum number of calls Gmail accepts in a single batch request
+BATCH_GET_SIZE = 100
+
+# Recently handled message IDs remembered to keep history sync and window scans from repeating work
+HANDLED_IDS_LIMIT = 1000
+
+# Cycles a message may fail to fetch before it is skipped instead of forcing a rescan
+MAX_FETCH_ATTEMPTS = 3
+
+# Maximum number of message IDs accepted by messages.batchModify
+BATCH_MODIFY_SIZE = 1000
+
 class GmailService:
     """
     Service class for handling Gmail API operations.
@@ -55,7 +79,14 @@ class GmailService:
         self.monitoring_active = False
         self.monitoring_thread = None
         self.last_check_time = None
+        self.last_history_id = None  # Gmail history cursor for incremental sync
+        self._handled_ids = OrderedDict()  # Recently labelled/saved message IDs, oldest first
+        self._fetch_failures = {}  # Message ID -> failed fetch cycles
         self.flow = None  # Store OAuth flow for web-based authentication
+        self.email_address = None  # Mailbox address, used to route push notifications
+        self.watch_expiration = None
+        self._watch_timer = None
+        self._wake_event = threading.Event()  # Set by push notifications to end the wait early
         
         logger.info("Gmail service initialized")
     
@@ -306,12 +337,15 @@ class GmailService:
             except Exception as e:
                 logger.error(f"Failed to initialize label '{label_name}': {str(e)}")
     
-    def start_monitoring(self, check_interval: int = 300) -> bool:
+    def start_monitoring(self, check_interval: int = 300, push_topic: Optional[str] = None) -> bool:
         """
         Start monitoring Gmail inbox for new emails.
         
         Args:
             check_interval (int): Interval between checks in seconds
+            push_topic (Optional[str]): Cloud Pub/Sub topic for Gmail push notifications.
+                When set, a mailbox change triggers a check straight away and polling
+                drops to at most once per PUSH_FALLBACK_INTERVAL as a safety net
             
         Returns:
             bool: True if monitoring started successfully
@@ -324,7 +358,11 @@ class GmailService:
             logger.error("Gmail service not authenticated")
             return False
         
+        if push_topic and not self.start_watch(push_topic):
+            logger.warning("Gmail push notifications unavailable, relying on polling only")
+        
         self.monitoring_active = True
+        self._wake_event.clear()
         self.monitoring_thread = threading.Thread(
             target=self._monitoring_loop,
             args=(check_interval,),
@@ -355,12 +393,102 @@ class GmailService:
             return True
         
         self.monitoring_active = False
+        self.stop_watch()
+        self._wake_event.set()  # Interrupt the wait between checks
         if self.monitoring_thread:
             self.monitoring_thread.join(timeout=10)
         
         logger.info("Email monitoring stopped")
         return True
     
+    def start_watch(self, topic_name: str) -> bool:
+        """
+        Ask Gmail to publish INBOX changes to a Cloud Pub/Sub topic.
+        
+        The watch is renewed automatically before it expires.
+        
+        Args:
+            topic_name (str): Full topic name, e.g. projects/<project>/topics/<topic>
+            
+        Returns:
+            bool: True if the watch is active
+        """
+        if not self.service:
+            logger.error("Gmail service not authenticated")
+            return False
+        
+        try:
+            if not self.email_address:
+                profile = self.service.users().getProfile(userId='me').execute(num_retries=API_NUM_RETRIES)
+                self.email_address = profile.get('emailAddress')
+            
+            response = self.service.users().watch(userId='me', body={
+                'topicName': topic_name,
+                'labelIds': ['INBOX'],
+                'labelFilterBehavior': 'INCLUDE'
+            }).execute(num_retries=API_NUM_RETRIES)
+            self.watch_expiration = datetime.fromtimestamp(int(response['expiration']) / 1000)
+            
+            # A single timer re-arms the watch before Gmail drops it
+            self._schedule_watch(topic_name, WATCH_RENEW_SECONDS)
+            
+            logger.info(f"Gmail push notifications active for {self.email_address} until {self.watch_expiration.isoformat()}")
+            return True
+            
+        except HttpError as e:
+            logger.error(f"Gmail API error starting watch: {str(e)}")
+        except Exception as e:
+            logger.error(f"Failed to start Gmail watch: {str(e)}")
+        
+        # Poll at the normal interval until a retry gets the watch back
+        self.watch_expiration = None
+        self._schedule_watch(topic_name, WATCH_RETRY_SECONDS)
+        logger.info(f"Retrying Gmail watch in {WATCH_RETRY_SECONDS} seconds")
+        return False
+    
+    def _schedule_watch(self, topic_name: str, delay: int):
+        """
+        Arm the single timer that (re-)registers the Gmail watch.
+        
+        Args:
+            topic_name (str): Full Pub/Sub topic name
+            delay (int): Seconds until start_watch runs
+        """
+        if self._watch_timer:
+            self._watch_timer.cancel()
+        self._watch_timer = threading.Timer(delay, self.start_watch, args=(topic_name,))
+        self._watch_timer.daemon = True
+        self._watch_timer.start()
+    
+    def stop_watch(self) -> bool:
+        """
+        Stop Gmail push notifications for this mailbox.
+        
+        Returns:
+            bool: True if no watch is left active
+        """
+        if self._watch_timer:
+            self._watch_timer.cancel()
+            self._watch_timer = None
+        
+        if not self.watch_expiration:
+            return True
+        
+        try:
+            self.service.users().stop(userId='me').execute(num_retries=API_NUM_RETRIES)
+            self.watch_expiration = None
+            logger.info("Gmail push notifications stopped")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to stop Gmail watch: {str(e)}")
+            return False
+    
+    def notify_mailbox_changed(self):
+        """
+        Handle a push notification: run the next check without waiting for the interval.
+        """
+        self._wake_event.set()
+    
     def _monitoring_loop(self, check_interval: int):
         """
         Main monitoring loop that runs in background thread.
@@ -396,27 +524,28 @@ class GmailService:
                     db_service = DuckDBService()
                     if not db_service.connect():
                         logger.error("Failed to connect to DuckDB")
+                        self.last_history_id = None  # Rescan the time window next cycle
                         continue
                     
                     # Ensure table exists
                     db_service.create_table()
                     
+                    # Records are buffered and upserted in one statement after the cycle
+                    pending_inserts = []
+                    
                     for email_data in all_emails:
                         gmail_id = email_data.get('gmail_id')
                         
                         # Check if this is a reprocess email or a new email
                         is_reprocess = email_data.get('is_reprocess', False)
                         
-                        # Check if email is already processed in database
-                        existing_record = db_service.get_extraction(gmail_id)
-                        
                         # Combine email body and attachment contents
                         combined_content = self._combine_email_content(email_data)
                         
                         if is_reprocess:
                             print(f"\n🔄 REPROCESSING EMAIL (Manager Request):")
                         else:
-                            print(f"\n🔔 {'UPDATING' if existing_record else 'NEW'} EMAIL:")
+                            print(f"\n🔔 NEW EMAIL:")
                         print(f"Subject: {email_data.get('subject', 'No Subject')}")
                         print(f"From: {email_data.get('sender', 'Unknown')}")
                         print(f"Received: {email_data.get('received_at', 'Unknown')}")
@@ -439,7 +568,7 @@ class GmailService:
                         print("=" * 80)
                         try:
                             extraction_result = extract_hardware_quotation_details(combined_content)
-                            print(json.dumps(extraction_result, indent=2))
+                            print(orjson.dumps(extraction_result, option=orjson.OPT_INDENT_2).decode())
                             
                             # Handle labels for reprocess vs new emails
                             if is_reprocess:
@@ -451,40 +580,53 @@ class GmailService:
                             if extraction_result.get("status") == "NOT_VALID":
                                 # Irrelevant email - only apply label, do NOT save to database
                                 self.add_label_to_email(gmail_id, "SnapQuote-Irrelevant", "grey")
+                                self._mark_handled(gmail_id)
                                 print(f"🏷️ Applied label: SnapQuote-Irrelevant (Grey)")
                                 print(f"⚠️ Email marked as irrelevant - NOT saved to database")
                             else:
-                                # Valid quotation - save to database and apply green label
-                                if existing_record:
-                                    success = db_service.update_extraction(gmail_id, extraction_result)
-                                    if success:
-                                        print(f"📝 Updated existing database record")
-                                    else:
-                                        print(f"❌ Failed to update database record")
-                                else:
-                                    record_id = db_service.insert_extraction(email_data, extraction_result)
-                                    if record_id:
-                                        print(f"💾 Saved to database with ID: {record_id}")
-                                    else:
-                                        print(f"❌ Failed to save to database")
-                                
-                                # Apply green label for valid quotations
-                                self.add_label_to_email(gmail_id, "SnapQuote-Fetched", "green")
-                                print(f"🏷️ Applied label: SnapQuote-Fetched (Green)")
+                                # Valid quotation - queue for saving; the green label follows the write
+                                pending_inserts.append((email_data, extraction_result))
+                                print(f"💾 Queued for database save")
                                 
                         except Exception as e:
                             print(f"❌ AI extraction failed: {str(e)}")
                             logger.error(f"AI extraction error: {str(e)}")
+                            # Left unlabelled; rescan the time window so the next cycle retries it
+                            self.last_history_id = None
                         
                         print("=" * 80)
                         print("✅ END OF PROCESSING\n")
                     
+                    if pending_inserts:
+                        record_ids = db_service.insert_extractions(pending_inserts)
+                        if record_ids:
+                            print(f"💾 Saved {len(record_ids)} records to database (IDs: {record_ids})")
+                            for email_data, _ in pending_inserts:
+                                self._mark_handled(email_data.get('gmail_id'))
+                            
+                            # Apply green label for valid quotations
+                            self.add_label_to_emails(
+                                [email_data.get('gmail_id') for email_data, _ in pending_inserts],
+                                "SnapQuote-Fetched", "green"
+                            )
+                            print(f"🏷️ Applied label: SnapQuote-Fetched (Green) to {len(pending_inserts)} emails")
+                        else:
+                            # Left unlabelled so the next cycle picks them up again
+                            print(f"❌ Failed to save {len(pending_inserts)} records to database")
+                            self.last_history_id = None
+                    
                     # Close database connection
                     db_service.disconnect()
                 
                 self.last_check_time = datetime.now()
-                logger.info(f"Sleeping for {check_interval} seconds before next check...")
-                time.sleep(check_interval)
+                # Only trust push while the watch is known to be live
+                push_active = self.watch_expiration is not None and self.watch_expiration > datetime.now()
+                wait_seconds = max(check_interval, PUSH_FALLBACK_INTERVAL) if push_active else check_interval
+                logger.info(f"Sleeping for {wait_seconds} seconds before next check...")
+                # Push notifications (and stop_monitoring) end the wait early
+                if self._wake_event.wait(wait_seconds):
+                    logger.info("Mailbox change notified, checking now")
+                self._wake_event.clear()
             except Exception as e:
                 logger.error(f"Error in monitoring loop: {str(e)}")
                 print(f"❌ Email monitoring error: {str(e)}")
@@ -495,10 +637,31 @@ class GmailService:
         """
         Check Gmail inbox for new emails since last check.
         
+        Uses the History API when a history cursor is available; otherwise
+        scans a recent time window and, once it fits in a single page, seeds
+        the cursor for the next check.
+        
         Returns:
             List[Dict]: List of new email data
         """
         try:
+            if self.last_history_id:
+                message_ids = self._list_history_message_ids()
+                if message_ids is not None:
+                    logger.info(f"Gmail history sync found {len(message_ids)} new messages")
+                    message_ids = self._unhandled_ids(message_ids)
+                    new_emails = self.get_emails_bulk(message_ids)
+                    if self._missing_email_ids(message_ids, new_emails):
+                        # The cursor is already past them; rescan the time window next cycle
+                        self.last_history_id = None
+                    return new_emails
+            
+            # Take the cursor before scanning so nothing arriving mid-scan is missed
+            profile = self.service.users().getProfile(userId='me').execute(num_retries=API_NUM_RETRIES)
+            history_id = profile.get('historyId')
+            if not self.email_address:
+                self.email_address = profile.get('emailAddress')
+            
             # Build query for recent emails WITHOUT SnapQuote labels
             query = "in:inbox -label:SnapQuote-Fetched -label:SnapQuote-Irrelevant"
             if self.last_check_time:
@@ -514,22 +677,18 @@ class GmailService:
             # Search for emails
             logger.info("Making Gmail API call...")
             results = self.service.users().messages().list(
-                userId='me', q=query, maxResults=10
-            ).execute()
+                userId='me', q=query, maxResults=10,
+                fields='messages/id,nextPageToken'
+            ).execute(num_retries=API_NUM_RETRIES)
             logger.info("Gmail API call completed")
             
-            messages = results.get('messages', [])
-            new_emails = []
-            
-            for message in messages:
-                try:
-                    email_data = self.get_email_details(message['id'])
-                    if email_data:
-                        new_emails.append(email_data)
-                except Exception as e:
-                    logger.error(f"Error processing email {message['id']}: {str(e)}")
-                    continue
+            message_ids = self._unhandled_ids([message['id'] for message in results.get('messages', [])])
+            new_emails = self.get_emails_bulk(message_ids)
             
+            # Only seed the cursor once the window is worked off; otherwise the
+            # next cycle scans again so mail past the first page is not skipped
+            if not results.get('nextPageToken') and not self._missing_email_ids(message_ids, new_emails):
+                self.last_history_id = history_id
             return new_emails
             
         except HttpError as e:
@@ -539,6 +698,105 @@ class GmailService:
             logger.error(f"Unexpected error checking emails: {str(e)}")
             return []
     
+    def _missing_email_ids(self, message_ids: List[str], emails: List[Dict]) -> List[str]:
+        """
+        Find message IDs that get_emails_bulk could not fetch or parse and
+        that are still worth retrying.
+        
+        Each miss is counted; after MAX_FETCH_ATTEMPTS cycles the message is
+        skipped so a single broken message cannot keep forcing rescans.
+        
+        Args:
+            message_ids (List[str]): Requested Gmail message IDs
+            emails (List[Dict]): Email details returned for them
+            
+        Returns:
+            List[str]: IDs with no matching email details that should be retried
+        """
+        fetched = {email_data.get('gmail_id') for email_data in emails}
+        missing = []
+        for message_id in message_ids:
+            if message_id in fetched:
+                self._fetch_failures.pop(message_id, None)
+                continue
+            
+            attempts = self._fetch_failures.get(message_id, 0) + 1
+            self._fetch_failures[message_id] = attempts
+            if attempts < MAX_FETCH_ATTEMPTS:
+                missing.append(message_id)
+            else:
+                logger.error(f"Skipping email {message_id} after {attempts} failed fetches")
+        
+        if missing:
+            logger.warning(f"Could not fetch {len(missing)} of {len(message_ids)} new emails, will retry")
+        return missing
+    
+    def _unhandled_ids(self, message_ids: List[str]) -> List[str]:
+        """
+        Drop message IDs that were already handled or have been given up on.
+        
+        Args:
+            message_ids (List[str]): Gmail message IDs found by history sync or the window scan
+            
+        Returns:
+            List[str]: IDs that still need processing
+        """
+        return [
+            message_id for message_id in message_ids
+            if message_id not in self._handled_ids
+            and self._fetch_failures.get(message_id, 0) < MAX_FETCH_ATTEMPTS
+        ]
+    
+    def _mark_handled(self, message_id: str):
+        """
+        Remember that a message was labelled or saved so it is not processed again.
+        
+        Args:
+            message_id (str): Gmail message ID
+        """
+        self._handled_ids[message_id] = None
+        self._handled_ids.move_to_end(message_id)
+        if len(self._handled_ids) > HANDLED_IDS_LIMIT:
+            self._handled_ids.popitem(last=False)
+    
+    def _list_history_message_ids(self) -> Optional[List[str]]:
+        """
+        List INBOX messages added since last_history_id and advance the cursor.
+        
+        Returns:
+            Optional[List[str]]: New message IDs in arrival order, or None if the
+                cursor has expired and a full scan is needed
+        """
+        message_ids = {}
+        params = {
+            'userId': 'me',
+            'startHistoryId': self.last_history_id,
+            'historyTypes': ['messageAdded'],
+            'labelId': 'INBOX'
+        }
+        
+        try:
+            while True:
+                response = self.service.users().history().list(**params).execute(num_retries=API_NUM_RETRIES)
+                for record in response.get('history', []):
+                    for added in record.get('messagesAdded', []):
+                        message_ids[added['message']['id']] = None
+                
+                if not response.get('nextPageToken'):
+                    break
+                params['pageToken'] = response['nextPageToken']
+            
+            self.last_history_id = response.get('historyId', self.last_history_id)
+            return list(message_ids)
+            
+        except HttpError as e:
+            if e.resp.status == 404:
+                # Gmail only keeps about a week of history
+                logger.warning("Gmail history cursor expired, falling back to a full scan")
+                self.last_history_id = None
+                return None
+            raise
+    
     def _check_for_reprocess_emails(self):
         """
         Check Gmail for emails with SnapQuote-Reprocess label.
@@ -559,23 +817,17 @@ class GmailService:
             # Search for emails
             logger.info("Making Gmail API call for reprocess emails...")
             results = self.service.users().messages().list(
-                userId='me', q=query, maxResults=50
-            ).execute()
+                userId='me', q=query, maxResults=50,
+                fields='messages/id,nextPageToken'
+            ).execute(num_retries=API_NUM_RETRIES)
             logger.info("Gmail reprocess API call completed")
             
             messages = results.get('messages', [])
-            reprocess_emails = []
+            reprocess_emails = self.get_emails_bulk([message['id'] for message in messages])
             
-            for message in messages:
-                try:
-                    email_data = self.get_email_details(message['id'])
-                    if email_data:
-                        # Mark this as a reprocess email
-                        email_data['is_reprocess'] = True
-                        reprocess_emails.append(email_data)
-                except Exception as e:
-                    logger.error(f"Error processing reprocess email {message['id']}: {str(e)}")
-                    continue
+            # Mark these as reprocess emails
+            for email_data in reprocess_emails:
+                email_data['is_reprocess'] = True
             
             return reprocess_emails
             
@@ -626,8 +878,82 @@ class GmailService:
             # Get the email
             message = self.service.users().messages().get(
                 userId='me', id=email_id, format='full'
-            ).execute()
+            ).execute(num_retries=API_NUM_RETRIES)
+            
+            return self._parse_message(message)
+            
+        except Exception as e:
+            logger.error(f"Error retrieving email details: {str(e)}")
+            return None
+    
+    def get_emails_bulk(self, email_ids: List[str]) -> List[Dict]:
+        """
+        Get detailed information for several emails, batching the
+        messages.get calls so each HTTP round-trip fetches up to
+        BATCH_GET_SIZE messages.
+        
+        Args:
+            email_ids (List[str]): Gmail message IDs
+            
+        Returns:
+            List[Dict]: Email details in the order of email_ids; messages
+                that could not be fetched or parsed are skipped
+        """
+        if not self.service:
+            logger.error("Gmail service not authenticated")
+            return []
+        
+        emails = []
+        for i in range(0, len(email_ids), BATCH_GET_SIZE):
+            chunk = email_ids[i:i + BATCH_GET_SIZE]
+            fetched = {}
+            
+            def collect(request_id, response, exception):
+                if exception is not None:
+                    logger.error(f"Error retrieving email {request_id}: {str(exception)}")
+                else:
+                    fetched[request_id] = response
+            
+            try:
+                batch = self.service.new_batch_http_request(callback=collect)
+                for email_id in chunk:
+                    batch.add(
+                        self.service.users().messages().get(userId='me', id=email_id, format='full'),
+                        request_id=email_id
+                    )
+                batch.execute()
+            except Exception as e:
+                logger.error(f"Error executing batch email request: {str(e)}")
             
+            for email_id in chunk:
+                message = fetched.get(email_id)
+                try:
+                    if message is None:
+                        # Batch entries are not retried; fetch rejected ones on their own with backoff
+                        email_data = self.get_email_details(email_id)
+                    else:
+                        email_data = self._parse_message(message)
+                    if email_data:
+                        emails.append(email_data)
+                except Exception as e:
+                    logger.error(f"Error processing email {email_id}: {str(e)}")
+        
+        return emails
+    
+    def _parse_message(self, message: Dict) -> Optional[Dict]:
+        """
+        Build the email details dict from a full-format Gmail message,
+        downloading and processing any supported attachments.
+        
+        Args:
+            message (Dict): Gmail message resource fetched with format='full'
+            
+        Returns:
+            Optional[Dict]: Email details or None if parsing failed
+        """
+        email_id = message['id']
+        
+        try:
             # Extract headers
             headers = {}
             for header in message['payload'].get('headers', []):
@@ -637,6 +963,7 @@ class GmailService:
             body_text = ""
             body_html = ""
             attachments = []
+            inline_data = {}  # attachment index -> base64 data sent inline with the message
             
             def extract_parts(part):
                 nonlocal body_text, body_html, attachments
@@ -661,13 +988,15 @@ class GmailService:
                 else:
                     # Check if this part is an attachment
                     filename = part.get('filename', '')
-                    if filename and part['body'].get('attachmentId'):
-                        # This is an attachment
+                    if filename and (part['body'].get('attachmentId') or part['body'].get('data')):
+                        # This is an attachment; small ones arrive inline in 'data'
+                        if part['body'].get('data'):
+                            inline_data[len(attachments)] = part['body']['data']
                         attachment_info = {
                             'filename': filename,
                             'mimeType': part.get('mimeType', ''),
                             'size': part['body'].get('size', 0),
-                            'attachmentId': part['body']['attachmentId']
+                            'attachmentId': part['body'].get('attachmentId')
                         }
                         attachments.append(attachment_info)
             
@@ -678,15 +1007,29 @@ class GmailService:
             else:
                 extract_parts(message['payload'])
             
-            # Process attachments and get their content
-            attachment_contents = []
-            for attachment in attachments:
-                if self._is_supported_file(attachment['filename']):
-                    content = self._get_attachment_content(email_id, attachment['attachmentId'])
-                    if content:
-                        processed_content = process_attachment(attachment['filename'], content)
-                        print
-                        attachment_contents.append(f"\n\n---\n# Attachment: {attachment['filename']}\n\n{processed_content}")
+            # Decode inline attachments, fetch the rest in one batch, then parse them in parallel
+            supported = [
+                index for index, attachment in enumerate(attachments)
+                if self._is_supported_file(attachment['filename'])
+            ]
+            fetched = self._get_attachment_contents(
+                email_id,
+                [attachments[index]['attachmentId'] for index in supported if index not in inline_data]
+            )
+            
+            downloaded = []
+            for index in supported:
+                if index in inline_data:
+                    content = base64.urlsafe_b64decode(inline_data[index])
+                else:
+                    content = fetched.get(attachments[index]['attachmentId'])
+                if content:
+                    downloaded.append((attachments[index]['filename'], content))
+            
+            attachment_contents = [
+                f"\n\n---\n# Attachment: {filename}\n\n{processed_content}"
+                for (filename, _), processed_content in zip(downloaded, process_attachments(downloaded))
+            ]
             
             # Convert timestamp
             timestamp = int(message['internalDate']) / 1000
@@ -705,7 +1048,7 @@ class GmailService:
             }
             
         except Exception as e:
-            logger.error(f"Error retrieving email details: {str(e)}")
+            logger.error(f"Error parsing email {email_id}: {str(e)}")
             return None
     
     def _is_supported_file(self, filename: str) -> bool:
@@ -718,7 +1061,7 @@ class GmailService:
         try:
             attachment = self.service.users().messages().attachments().get(
                 userId='me', messageId=email_id, id=attachment_id
-            ).execute()
+            ).execute(num_retries=API_NUM_RETRIES)
             
             data = attachment.get('data')
             if data:
@@ -729,6 +1072,60 @@ class GmailService:
             logger.error(f"Error retrieving attachment content: {str(e)}")
             return None
     
+    def _get_attachment_contents(self, email_id: str, attachment_ids: List[str]) -> Dict[str, bytes]:
+        """
+        Get the content of several attachments of one email, batching the
+        attachments.get calls into a single HTTP round-trip.
+        
+        Args:
+            email_id (str): Gmail message ID
+            attachment_ids (List[str]): Attachment IDs within that message
+            
+        Returns:
+            Dict[str, bytes]: Decoded content keyed by attachment ID; failed
+                downloads are left out
+        """
+        if len(attachment_ids) <= 1:
+            contents = {}
+            for attachment_id in attachment_ids:
+                content = self._get_attachment_content(email_id, attachment_id)
+                if content:
+                    contents[attachment_id] = content
+            return contents
+        
+        contents = {}
+        
+        def collect(request_id, response, exception):
+            if exception is not None:
+                logger.error(f"Error retrieving attachment content: {str(exception)}")
+                return
+            data = response.get('data')
+            if data:
+                contents[attachment_ids[int(request_id)]] = base64.urlsafe_b64decode(data)
+        
+        try:
+            for i in range(0, len(attachment_ids), BATCH_GET_SIZE):
+                batch = self.service.new_batch_http_request(callback=collect)
+                for index in range(i, min(i + BATCH_GET_SIZE, len(attachment_ids))):
+                    batch.add(
+                        self.service.users().messages().attachments().get(
+                            userId='me', messageId=email_id, id=attachment_ids[index]
+                        ),
+                        request_id=str(index)
+                    )
+                batch.execute()
+        except Exception as e:
+            logger.error(f"Error executing batch attachment request: {str(e)}")
+        
+        # Batch entries are not retried; fetch rejected ones on their own with backoff
+        for attachment_id in attachment_ids:
+            if attachment_id not in contents:
+                content = self._get_attachment_content(email_id, attachment_id)
+                if content:
+                    contents[attachment_id] = content
+        
+        return contents
+    
     def _combine_email_content(self, email_data: Dict) -> str:
         """
         Combine email body and attachment contents into one markdown string.
@@ -948,7 +1345,7 @@ class GmailService:
         
         try:
             # Check if label already exists
-            labels = self.service.users().labels().list(userId='me').execute()
+            labels = self.service.users().labels().list(userId='me').execute(num_retries=API_NUM_RETRIES)
             for label in labels.get('labels', []):
                 if label['name'] == label_name:
                     return label['id']
@@ -975,7 +1372,7 @@ class GmailService:
             
             created_label = self.service.users().labels().create(
                 userId='me', body=label_object
-            ).execute()
+            ).execute(num_retries=API_NUM_RETRIES)
             
             logger.info(f"Created Gmail label: {label_name} with ID: {created_label['id']}")
             return created_label['id']
@@ -1011,7 +1408,7 @@ class GmailService:
                 userId='me',
                 id=email_id,
                 body={'addLabelIds': [label_id]}
-            ).execute()
+            ).execute(num_retries=API_NUM_RETRIES)
             
             logger.info(f"Added label '{label_name}' to email {email_id}")
             return True
@@ -1020,6 +1417,44 @@ class GmailService:
             logger.error(f"Error adding label to email: {str(e)}")
             return False
     
+    def add_label_to_emails(self, email_ids: List[str], label_name: str, color: str = 'grey') -> bool:
+        """
+        Add label to several emails with batchModify instead of one modify call per email.
+        
+        Args:
+            email_ids (List[str]): Gmail message IDs
+            label_name (str): Name of the label to add
+            color (str): Color for the label if it needs to be created
+            
+        Returns:
+            bool: True if label added to all emails successfully
+        """
+        if not self.service:
+            logger.error("Gmail service not authenticated")
+            return False
+        
+        if not email_ids:
+            return True
+        
+        try:
+            # Get or create label
+            label_id = self.create_label_if_not_exists(label_name, color)
+            if not label_id:
+                return False
+            
+            for i in range(0, len(email_ids), BATCH_MODIFY_SIZE):
+                self.service.users().messages().batchModify(
+                    userId='me',
+                    body={'ids': email_ids[i:i + BATCH_MODIFY_SIZE], 'addLabelIds': [label_id]}
+                ).execute(num_retries=API_NUM_RETRIES)
+            
+            logger.info(f"Added label '{label_name}' to {len(email_ids)} emails")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error adding label to emails: {str(e)}")
+            return False
+    
     def remove_label_from_email(self, email_id: str, label_name: str) -> bool:
         """
         Remove label from an email.
@@ -1037,7 +1472,7 @@ class GmailService:
         
         try:
             # Find the label ID by name
-            labels = self.service.users().labels().list(userId='me').execute()
+            labels = self.service.users().labels().list(userId='me').execute(num_retries=API_NUM_RETRIES)
             label_id = None
             for label in labels.get('labels', []):
                 if label['name'] == label_name:
@@ -1053,7 +1488,7 @@ class GmailService:
                 userId='me',
                 id=email_id,
                 body={'removeLabelIds': [label_id]}
-            ).execute()
+            ).execute(num_retries=API_NUM_RETRIES)
             
             logger.info(f"Removed label '{label_name}' from email {email_id}")
             return True
@@ -1,12 +1,240 @@
 import os
+import hashlib
 import logging
-from typing import Dict, Optional, List
-import json
+import threading
+import time
+from typing import BinaryIO, Dict, Optional, List, Tuple, Union
+import traceback
 from datetime import datetime
-import shutil
+import tempfile
+import zipfile
+from collections import OrderedDict
+from io import BytesIO
+from xml.etree import ElementTree
+import orjson
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+from openpyxl.cell.text import InlineFont
+from openpyxl.styles import Alignment, Font
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
 
 logger = logging.getLogger(__name__)
 
+# Quotation template layout (first worksheet of QuotationFormat.xlsx)
+ROW_CLIENT_NAME = 2  # Client name, email and phone fill COL_CLIENT in consecutive rows
+COL_CLIENT = 2
+START_ROW = 12      # First requirement row
+MAX_ROWS = 800      # Pre-formatted requirement rows in the template
+COL_DESC, COL_QTY, COL_UNIT, COL_UPRICE, COL_TOTAL = 2, 6, 7, 8, 9
+SAVE_BUFFER_SIZE = 1 << 20  # 1 MiB write buffer for workbook saves
+OUTPUT_CACHE_SIZE = 32  # Filled quotations kept in memory for repeated downloads
+OUTPUT_MAX_AGE_HOURS = 24  # Generated files older than this are removed when the service is created
+COL_DESC_LETTER = get_column_letter(COL_DESC)
+COL_QTY_LETTER = get_column_letter(COL_QTY)
+COL_UPRICE_LETTER = get_column_letter(COL_UPRICE)
+COL_TOTAL_LETTER = get_column_letter(COL_TOTAL)
+
+# Layout for the write-only generator, taken from the template
+_WRITEONLY_HEADERS = (
+    "SL. No.", "Description", "Brand & Model", "Image", "Delivery Lead Time",
+    "Qty", "Unit", "Unit Price (AED)", "Total Price (AED)",
+)
+_WRITEONLY_COLUMN_WIDTHS = {'A': 11.3, 'B': 50.7, 'C': 21.3, 'D': 24.6, 'E': 20.7, 'F': 10.0, 'G': 10.6, 'H': 13.1, 'I': 13.1}
+# Static rows above the requirements: (bold label in A, extraction_result key for B)
+_WRITEONLY_LABEL_ROWS = (
+    ("QUOTATION", None),
+    ("To:", 'to'),
+    ("Attn:", 'email'),
+    ("Mobile: ", 'mobile'),
+    ("Email:", None),
+    ("From:", None),
+)
+_WRITEONLY_INTRO_ROWS = (
+    (),
+    ("Good Day ,",),
+    ("Thank you for your enquiry, we are pleased to offer the following in line with your requirement.",),
+    (),
+)
+_PART1_FONT = InlineFont(color='800080', b=True, u='single')  # "Your requirements:" - Purple
+_PART3_FONT = InlineFont(color='FF0000', b=True, u='single')  # "We OFFER:" - Red
+_LABEL_FONT = Font(bold=True)
+_DESCRIPTION_ALIGNMENT = Alignment(wrap_text=True, vertical='top')
+_PART1_BLOCK = TextBlock(_PART1_FONT, "Your requirements:\n\n")
+_PART3_BLOCK = TextBlock(_PART3_FONT, "We OFFER:")
+
+# Output formats Excel can save a filled quotation in: (FileFormat, extension, MIME type)
+OUTPUT_FORMATS = {
+    'xlsx': (51, '.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),  # xlOpenXMLWorkbook
+    'xlsb': (50, '.xlsb', 'application/vnd.ms-excel.sheet.binary.macroEnabled.12'),  # xlExcel12
+}
+
+_MERGE_CELL_TAG = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}mergeCell'
+_MERGE_CELLS_END = b'</mergeCells>'
+
+
+def _read_merged_ranges(archive: zipfile.ZipFile, worksheet_path: str) -> List[CellRange]:
+    """
+    Read a worksheet's merged ranges straight from its XML part.
+    
+    <mergeCells> follows <sheetData> in the sheet XML, so only that element is
+    sliced out and parsed instead of every cell. Sheets using a namespace
+    prefix fall back to a full streaming parse.
+    
+    Args:
+        archive (zipfile.ZipFile): Opened workbook archive
+        worksheet_path (str): Path of the worksheet part inside the archive
+        
+    Returns:
+        List[CellRange]: Merged cell ranges in document order
+    """
+    sheet_xml = archive.read(worksheet_path)
+    if b'mergeCell' not in sheet_xml:
+        return []
+    
+    start = sheet_xml.find(b'<mergeCells')
+    end = sheet_xml.find(_MERGE_CELLS_END, start)
+    if start != -1 and end != -1:
+        merge_cells = ElementTree.fromstring(sheet_xml[start:end + len(_MERGE_CELLS_END)])
+        return [CellRange(element.get('ref')) for element in merge_cells]
+    
+    merged_ranges = []
+    for _, element in ElementTree.iterparse(BytesIO(sheet_xml)):
+        if element.tag == _MERGE_CELL_TAG:
+            merged_ranges.append(CellRange(element.get('ref')))
+        element.clear()
+    return merged_ranges
+
+def _make_temp_path(directory: str, extension: str = '.xlsx') -> str:
+    """
+    Reserve a temporary workbook path in the given directory.
+    
+    Args:
+        directory (str): Directory the file will later be moved out of
+        extension (str): File extension; Excel picks the save format from it
+        
+    Returns:
+        str: Path of the (empty) temporary file
+    """
+    fd, temp_path = tempfile.mkstemp(suffix=extension, dir=directory or '.')
+    os.close(fd)
+    return temp_path
+
+
+def _write_atomic(path: str, data: bytes):
+    """
+    Write bytes to a path so readers never see a partially written file.
+    
+    Args:
+        path (str): Destination file path
+        data (bytes): File contents
+    """
+    temp_path = _make_temp_path(os.path.dirname(path))
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+# Template file contents keyed by path, reloaded only when the file's (mtime_ns, size) changes
+_template_cache: Dict[str, Tuple[Tuple[int, int], bytes]] = {}
+_template_lock = threading.Lock()
+
+
+def _read_template(template_path: str) -> bytes:
+    """
+    Get the template file's bytes, reading from disk only when it has changed.
+    
+    Args:
+        template_path (str): Path to the Excel template file
+        
+    Returns:
+        bytes: Raw template file contents
+        
+    Raises:
+        FileNotFoundError: If the template does not exist
+    """
+    stat = os.stat(template_path)
+    # Size as well as mtime, so a rewrite within the filesystem's timestamp granularity is still seen
+    version = (stat.st_mtime_ns, stat.st_size)
+    
+    with _template_lock:
+        cached = _template_cache.get(template_path)
+        if cached and cached[0] == version:
+            return cached[1]
+        
+        with open(template_path, 'rb') as f:
+            data = f.read()
+        _template_cache[template_path] = (version, data)
+        # Quotations filled from an older version of the template are stale
+        _clear_output_cache()
+        logger.info(f"Template loaded into cache: {template_path} ({len(data)} bytes)")
+        return data
+
+
+# Filled quotation bytes keyed by (gmail_id, extraction hash, output format), least recently used first
+_output_cache: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+_output_lock = threading.Lock()
+
+
+def _output_cache_key(gmail_id: str, extraction_result: Dict, output_format: str) -> Tuple[str, str, str]:
+    """
+    Build the cache key for a filled quotation.
+    
+    Args:
+        gmail_id (str): Gmail message ID
+        extraction_result (Dict): AI extraction result the quotation is filled from
+        output_format (str): Key of OUTPUT_FORMATS
+        
+    Returns:
+        Tuple[str, str, str]: gmail_id, hash of the canonical extraction JSON, format
+    """
+    canonical = orjson.dumps(extraction_result, option=orjson.OPT_SORT_KEYS)
+    return (gmail_id, hashlib.blake2b(canonical, digest_size=16).hexdigest(), output_format)
+
+
+def _get_cached_output(key: Tuple[str, str, str]) -> Optional[bytes]:
+    """
+    Look up a filled quotation, marking it as recently used.
+    
+    Args:
+        key (Tuple[str, str, str]): Key from _output_cache_key
+        
+    Returns:
+        Optional[bytes]: Workbook bytes, None on a miss
+    """
+    with _output_lock:
+        data = _output_cache.get(key)
+        if data is not None:
+            _output_cache.move_to_end(key)
+        return data
+
+
+def _store_cached_output(key: Tuple[str, str, str], data: bytes):
+    """
+    Cache a filled quotation, evicting the least recently used beyond OUTPUT_CACHE_SIZE.
+    
+    Args:
+        key (Tuple[str, str, str]): Key from _output_cache_key
+        data (bytes): Workbook bytes
+    """
+    with _output_lock:
+        _output_cache[key] = data
+        _output_cache.move_to_end(key)
+        while len(_output_cache) > OUTPUT_CACHE_SIZE:
+            _output_cache.popitem(last=False)
+
+
+def _clear_output_cache():
+    """
+    Drop every cached quotation.
+    """
+    with _output_lock:
+        _output_cache.clear()
+
 
 class ExcelGenerationService:
     """
@@ -21,61 +249,89 @@ class ExcelGenerationService:
             template_path (str): Path to the Excel template file
             output_dir (str): Directory to save generated files
         """
-        self.template_path = template_path
+        # Resolved once so COM calls don't redo it per quotation
+        self.template_path = os.path.abspath(template_path)
         self.output_dir = output_dir
-
-        # Forcefully delete the output directory if it exists
-        if os.path.exists(output_dir):
-            try:
-                shutil.rmtree(output_dir)
-                logger.info(f"Deleted existing output directory: {output_dir}")
-            except Exception as e:
-                logger.error(f"Failed to delete output directory '{output_dir}': {str(e)}")
+        self.last_output_format = None
+        if not os.path.isfile(self.template_path):
+            logger.warning(f"Template file not found: {self.template_path}")
 
         # Ensure output directory exists
         os.makedirs(output_dir, exist_ok=True)
 
+        # Drop stale quotations instead of wiping the directory, which would also delete
+        # files another request has just generated and not yet downloaded
+        self.cleanup_old_files()
+
         logger.info(f"Excel generation service initialized")
         logger.info(f"Template: {template_path}")
         logger.info(f"Output directory: {output_dir}")
     
     
-    def generate_quotation_excel(self, gmail_id: str, extraction_data: Dict, copy_only: bool = False) -> Optional[str]:
+    def generate_quotation_excel(self, gmail_id: str, extraction_data: Dict, copy_only: bool = False,
+                                 sink: Optional[Union[str, BinaryIO]] = None,
+                                 output_format: str = 'xlsx') -> Optional[Union[str, BinaryIO]]:
         """
-        Generate a quotation Excel file from extraction data by copying the template, renaming, and editing.
+        Generate a quotation Excel file from extraction data by opening the template, editing, and saving under a new name.
         Uses ONLY win32com to preserve ALL Excel formatting perfectly.
         
         Args:
             gmail_id (str): Gmail message ID for unique filename
             extraction_data (Dict): Email extraction data from database
             copy_only (bool): If True, only copy the template without editing
+            sink (Optional[Union[str, BinaryIO]]): Where to put the workbook. None saves a
+                uniquely named file in the output directory, a str is written atomically
+                to that path, and a binary file-like object receives the workbook bytes
+            output_format (str): Key of OUTPUT_FORMATS. Binary .xlsb is smaller and faster
+                to open but needs Excel to write it; without a filled workbook the
+                template is returned as .xlsx. The format actually produced is stored
+                in self.last_output_format
         Returns:
-            Optional[str]: Path to generated Excel file, None if failed
+            Optional[Union[str, BinaryIO]]: Path to the generated file (or the sink object
+                when a file-like sink was given), None if failed
         """
+        if output_format not in OUTPUT_FORMATS:
+            logger.error(f"Unsupported quotation output format: {output_format}")
+            return None
+        file_format, extension, _ = OUTPUT_FORMATS[output_format]
+        
+        pythoncom = None
         excel = None
         wb = None
         ws = None
+        temp_path = None
         
         try:
-            if not os.path.exists(self.template_path):
+            try:
+                template_bytes = _read_template(self.template_path)
+            except FileNotFoundError:
                 raise FileNotFoundError(f"Template file not found: {self.template_path}")
 
-            # Create unique filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"quotation_{gmail_id}_{timestamp}.xlsx"
-            output_path = os.path.join(self.output_dir, filename)
+            # Default file names are picked once the produced format is known
+            output_path = sink if isinstance(sink, str) else None
 
-            # --- Step 1: Create exact copy (simulate Windows copy-paste) ---
-            shutil.copy2(self.template_path, output_path)
-            logger.info(f"Created exact copy: {output_path}")
+            extraction_result = extraction_data.get('extraction_result', {})
+            filled = False
 
-            if copy_only:
-                logger.info(f"Quotation Excel generated (copy only, perfect fidelity): {output_path}")
-                return output_path
+            # Repeated requests for the same extraction (retries, reloads) reuse the last fill
+            if not copy_only and extraction_result:
+                cache_key = _output_cache_key(gmail_id, extraction_result, output_format)
+                cached_bytes = _get_cached_output(cache_key)
+                if cached_bytes is not None:
+                    if sink is None:
+                        output_path = self._default_output_path(gmail_id, extension)
+                    if output_path:
+                        _write_atomic(output_path, cached_bytes)
+                    else:
+                        sink.write(cached_bytes)
+                    self.last_output_format = output_format
+                    logger.info(f"Quotation Excel served from cache: {output_path or 'in-memory sink'}")
+                    return output_path if output_path else sink
 
-            # --- Step 2: Edit content using ONLY win32com ---
-            extraction_result = extraction_data.get('extraction_result', {})
-            if extraction_result:
+            # --- Edit content using ONLY win32com ---
+            # The template is opened read-only and saved to a temporary file next to
+            # the destination, which is then moved into place (or streamed to the sink).
+            if not copy_only and extraction_result:
                 try:
                     from win32com.client import Dispatch
                     import pythoncom
@@ -87,18 +343,37 @@ class ExcelGenerationService:
                     excel = Dispatch("Excel.Application")
                     excel.Visible = False  # Run in background
                     excel.DisplayAlerts = False  # Suppress dialogs
+                    excel.ScreenUpdating = False  # Skip redraws between cell writes
                     
-                    # Open the copied workbook
-                    wb = excel.Workbooks.Open(os.path.abspath(output_path))
+                    # Open the template without locking it for writing
+                    wb = excel.Workbooks.Open(self.template_path, ReadOnly=True)
                     ws = wb.Worksheets(1)  # First worksheet
                     
                     # Fill the template
                     self._fill_quotation_template_win32(ws, extraction_data, extraction_result)
                     
-                    # Save and close
-                    wb.Save()
-                    wb.Close(SaveChanges=True)
+                    # Save under a temporary name in the requested format and close
+                    temp_path = _make_temp_path(os.path.dirname(output_path) if output_path else self.output_dir, extension)
+                    wb.SaveAs(os.path.abspath(temp_path), FileFormat=file_format)
+                    wb.Close(SaveChanges=False)
+                    wb = None
                     excel.Quit()
+                    excel = None
+                    
+                    # One exact-size read; the bytes are cached and, for an in-memory
+                    # sink, written once so it grows once instead of once per chunk
+                    with open(temp_path, 'rb') as f:
+                        workbook_bytes = f.read()
+                    _store_cached_output(cache_key, workbook_bytes)
+                    
+                    if sink is None:
+                        output_path = self._default_output_path(gmail_id, extension)
+                    if output_path:
+                        os.replace(temp_path, output_path)
+                    else:
+                        sink.write(workbook_bytes)
+                    filled = True
+                    self.last_output_format = output_format
                     
                     logger.info("Template filled using win32com - ALL formatting preserved")
                     
@@ -107,32 +382,174 @@ class ExcelGenerationService:
                     logger.error("Falling back to file copy only (no data insertion)")
                 except Exception as e:
                     logger.error(f"Error using win32com: {str(e)}")
-                    import traceback
                     logger.error(traceback.format_exc())
                     logger.error("Falling back to file copy only (no data insertion)")
                 finally:
-                    # Clean up COM objects
+                    # Clean up COM objects; after a failure Excel is still running
+                    # with the template open, so close it rather than leave it behind
+                    ws = None
                     try:
-                        if ws:
-                            del ws
-                        if wb:
-                            del wb
-                        if excel:
-                            del excel
+                        if wb is not None:
+                            wb.Close(SaveChanges=False)
+                        if excel is not None:
+                            excel.Quit()
+                    except Exception as e:
+                        logger.warning(f"Error closing Excel: {str(e)}")
+                    wb = None
+                    excel = None
+                    if pythoncom is not None:
                         pythoncom.CoUninitialize()
-                    except:
-                        pass
-            else:
+            elif not copy_only:
                 logger.info("No extraction_result data to fill. Only template copy performed.")
 
-            logger.info(f"Quotation Excel generated: {output_path}")
-            return output_path
+            if not filled:
+                # Exact copy from the cached template bytes
+                if output_format != 'xlsx':
+                    logger.warning(f"Cannot write {output_format} without Excel, returning the .xlsx template")
+                self.last_output_format = 'xlsx'
+                if sink is None:
+                    output_path = self._default_output_path(gmail_id)
+                if output_path:
+                    _write_atomic(output_path, template_bytes)
+                else:
+                    sink.write(template_bytes)
+                logger.info(f"Created exact copy: {output_path or 'in-memory sink'}")
+
+            target = output_path or 'in-memory sink'
+
+            if copy_only:
+                logger.info(f"Quotation Excel generated (copy only, perfect fidelity): {target}")
+            else:
+                logger.info(f"Quotation Excel generated: {target}")
+            return output_path if output_path else sink
 
         except Exception as e:
             logger.error(f"Error generating quotation Excel: {str(e)}")
-            import traceback
             logger.error(traceback.format_exc())
             return None
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def generate_quotation_excel_writeonly(self, gmail_id: str, extraction_data: Dict,
+                                           sink: Optional[Union[str, BinaryIO]] = None) -> Optional[Union[str, BinaryIO]]:
+        """
+        Generate a quotation Excel file from scratch with a write-only openpyxl workbook.
+        
+        Rows are streamed out as they are appended, so memory stays flat for quotations
+        with many requirements and no template has to be parsed. The layout follows the
+        template (same rows and columns) but not its full styling; use
+        generate_quotation_excel when exact template fidelity is needed.
+        
+        Args:
+            gmail_id (str): Gmail message ID for unique filename
+            extraction_data (Dict): Email extraction data from database
+            sink (Optional[Union[str, BinaryIO]]): Same as for generate_quotation_excel
+        Returns:
+            Optional[Union[str, BinaryIO]]: Path to the generated file (or the sink object
+                when a file-like sink was given), None if failed
+        """
+        try:
+            if sink is None:
+                output_path = self._default_output_path(gmail_id)
+            elif isinstance(sink, str):
+                output_path = sink
+            else:
+                output_path = None
+            
+            extraction_result = extraction_data.get('extraction_result', {}) or {}
+            requirements = extraction_result.get('Requirements', [])[:MAX_ROWS]
+            
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet("Quotation")
+            for letter, width in _WRITEONLY_COLUMN_WIDTHS.items():
+                ws.column_dimensions[letter].width = width
+            
+            # Styled cells are built once and reused; each append serializes the row immediately
+            label_cell = WriteOnlyCell(ws)
+            label_cell.font = _LABEL_FONT
+            description_cell = WriteOnlyCell(ws)
+            description_cell.alignment = _DESCRIPTION_ALIGNMENT
+            
+            # Header block - rows 1 to START_ROW - 1, matching the template positions
+            for label, key in _WRITEONLY_LABEL_ROWS:
+                label_cell.value = label
+                ws.append([label_cell, str(extraction_result.get(key) or '')] if key else [label_cell])
+            for row_values in _WRITEONLY_INTRO_ROWS:
+                ws.append(row_values)
+            header_cells = []
+            for header in _WRITEONLY_HEADERS:
+                header_cell = WriteOnlyCell(ws, value=header)
+                header_cell.font = _LABEL_FONT
+                header_cells.append(header_cell)
+            ws.append(header_cells)
+            
+            for idx, requirement in enumerate(requirements):
+                row = START_ROW + idx
+                get = requirement.get
+                description, brand, qty, unit, unit_price = (
+                    get('Description', ''), get("Brand and model"), get("Quantity"), get("Unit"), get("Unit price")
+                )
+                description_cell.value = CellRichText(_PART1_BLOCK, str(description) + "\n\n", _PART3_BLOCK)
+                ws.append([
+                    idx + 1,
+                    description_cell,
+                    brand or None,
+                    None,
+                    "Ex stock, subject to prior sales.",
+                    qty or None,
+                    unit or None,
+                    unit_price or None,
+                    f"={COL_QTY_LETTER}{row}*{COL_UPRICE_LETTER}{row}",
+                ])
+            
+            # Totals directly below the last requirement row
+            total_row = START_ROW + len(requirements)
+            col = COL_TOTAL_LETTER
+            blank = [None] * (COL_TOTAL - 2)
+            for label, formula in (
+                ("Total Amount (AED).", f"=SUM({col}{START_ROW}:{col}{total_row - 1})"),
+                ("VAT 5% (AED).", f"={col}{total_row}*0.05"),
+                ("GRAND TOTAL AMOUNT (AED).", f"={col}{total_row}+{col}{total_row + 1}"),
+            ):
+                label_cell.value = label
+                ws.append([label_cell] + blank + [formula])
+            
+            if output_path:
+                temp_path = _make_temp_path(os.path.dirname(output_path))
+                try:
+                    # Large buffer so the zip writer's many small deflate chunks become few write() calls
+                    with open(temp_path, 'wb', buffering=SAVE_BUFFER_SIZE) as f:
+                        wb.save(f)
+                    os.replace(temp_path, output_path)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+            else:
+                wb.save(sink)
+            
+            logger.info(f"Quotation Excel generated (write-only): {output_path or 'in-memory sink'}")
+            return output_path if output_path else sink
+            
+        except Exception as e:
+            logger.error(f"Error generating write-only quotation Excel: {str(e)}")
+            logger.error(traceback.format_exc())
+            return None
+    
+    def _default_output_path(self, gmail_id: str, extension: str = '.xlsx') -> str:
+        """
+        Build a unique output file path for a quotation.
+        
+        Args:
+            gmail_id (str): Gmail message ID
+            extension (str): File extension of the output format
+            
+        Returns:
+            str: Path inside the output directory
+        """
+        # Nanosecond stamp: cheaper than strftime and unique within the same second
+        filename = f"quotation_{gmail_id}_{time.time_ns()}{extension}"
+        return os.path.join(self.output_dir, filename)
     
     def _fill_quotation_template_win32(self, ws, email_data: Dict, extraction_result: Dict):
         """
@@ -143,103 +560,106 @@ class ExcelGenerationService:
             ws: win32com Worksheet object
             email_data (Dict): Email metadata
             extraction_result (Dict): AI extraction result
+            
+        Raises:
+            Exception: Any COM error, so the caller falls back to the template copy
         """
         try:
-            # Client Information - Name in B2
-            if 'to' in extraction_result:
-                client_name = extraction_result.get('to', '')
-                if client_name:
-                    ws.Range('B2').Value = str(client_name)
-            
-            # Client Email - B3
-            if 'email' in extraction_result:
-                client_email = extraction_result.get('email', '')
-                if client_email:
-                    ws.Range('B3').Value = str(client_email)
-            
-            # Client Phone - B4
-            if 'mobile' in extraction_result:
-                client_phone = extraction_result.get('mobile', '')
-                if client_phone:
-                    ws.Range('B4').Value = str(client_phone)
+            # Client Information - Name, Email, Phone in B2:B4
+            client_values = tuple(
+                str(value) if value else None
+                for value in (
+                    extraction_result.get('to'),
+                    extraction_result.get('email'),
+                    extraction_result.get('mobile'),
+                )
+            )
+            if all(client_values):
+                # One block write when every field is present
+                ws.Range(
+                    ws.Cells(ROW_CLIENT_NAME, COL_CLIENT),
+                    ws.Cells(ROW_CLIENT_NAME + len(client_values) - 1, COL_CLIENT)
+                ).Value = tuple((value,) for value in client_values)
+            else:
+                # Writing None through COM clears the cell, so keep the template's
+                # text in place by only writing the fields we have
+                for offset, value in enumerate(client_values):
+                    if value:
+                        ws.Cells(ROW_CLIENT_NAME + offset, COL_CLIENT).Value = value
             
-            # Fill requirements/items starting from row 12, up to a maximum of 800 rows (row 12 to 111)
+            # Fill requirements/items starting from START_ROW, up to MAX_ROWS rows
             requirements = extraction_result.get('Requirements', [])
-            start_row = 12
-            max_rows = 800
-            current_row = start_row
             num_filled = 0
             if requirements:
-                for idx, requirement in enumerate(requirements[:max_rows]):
-                    req_row = start_row + idx
-                    current_row = req_row
-                    num_filled += 1
-                    # Description with rich text formatting using GetCharacters
-                    description_text = str(requirement.get('Description', ''))
-                    # Build the complete text
-                    part1 = "Your requirements:\n\n"
-                    part2 = description_text + "\n\n"
-                    part3 = "We OFFER:"
-                    part4 = " "  # Empty text placeholder for black color ending
-                    full_text = part1 + part2 + part3 + part4
-                    # Set the full text in the cell first
-                    cell = ws.Cells(req_row, 2)  # Column B
-                    cell.Value = full_text
-                    # Now format different parts with different colors using GetCharacters
+                requirements = requirements[:MAX_ROWS]
+                num_filled = len(requirements)
+                last_row = START_ROW + num_filled - 1
+                
+                # Fixed rich-text parts around each description
+                part1 = "Your requirements:\n\n"
+                part3 = "We OFFER:"
+                part4 = " "  # Empty text placeholder for black color ending
+                len_part1 = len(part1)
+                len_part3 = len(part3)
+                
+                # Build every row's values up front so each column block is one COM call
+                descriptions = []
+                item_values = []
+                for requirement in requirements:
+                    get = requirement.get
+                    description, qty, unit, unit_price = (
+                        get('Description', ''), get("Quantity"), get("Unit"), get("Unit price")
+                    )
+                    descriptions.append((part1 + str(description) + "\n\n" + part3 + part4,))
+                    # Quantity, Unit, Unit price - Columns F:H (None leaves the cell empty)
+                    item_values.append((
+                        str(qty) if qty else None,
+                        str(unit) if unit else None,
+                        str(unit_price) if unit_price else None,
+                    ))
+                
+                description_range = ws.Range(f"{COL_DESC_LETTER}{START_ROW}:{COL_DESC_LETTER}{last_row}")
+                description_range.Value = descriptions
+                ws.Range(f"{COL_QTY_LETTER}{START_ROW}:{COL_UPRICE_LETTER}{last_row}").Value = item_values
+                
+                # Description text and trailing placeholder - Black, Normal for the whole block
+                description_range.Font.Color = 0x000000  # Black
+                description_range.Font.Bold = False
+                description_range.Font.Underline = False
+                
+                # Only the two labelled parts need per-cell character formatting
+                for idx, (full_text,) in enumerate(descriptions):
+                    cell = ws.Cells(START_ROW + idx, COL_DESC)
                     # Part 1: "Your requirements:" - Purple, Bold, Underline
-                    len_part1 = len(part1)
                     chars1 = cell.GetCharacters(1, len_part1)  # Start at position 1
                     chars1.Font.Color = 0x800080  # Purple (RGB in BGR format)
                     chars1.Font.Bold = True
                     chars1.Font.Underline = True
-                    # Part 2: Description - Normal Black
-                    len_part2 = len(part2)
-                    chars2 = cell.GetCharacters(len_part1 + 1, len_part2)
-                    chars2.Font.Color = 0x000000  # Black
-                    chars2.Font.Bold = False
-                    chars2.Font.Underline = False
                     # Part 3: "We OFFER:" - Red, Bold, Underline
-                    len_part3 = len(part3)
-                    chars3 = cell.GetCharacters(len_part1 + len_part2 + 1, len_part3)
+                    start_part3 = len(full_text) - len(part4) - len_part3 + 1
+                    chars3 = cell.GetCharacters(start_part3, len_part3)
                     chars3.Font.Color = 0x0000FF  # Red (RGB in BGR format: 0x00RRGGBB)
                     chars3.Font.Bold = True
                     chars3.Font.Underline = True
-                    # Part 4: Empty text - Black, Normal
-                    len_part4 = len(part4)
-                    chars4 = cell.GetCharacters(len_part1 + len_part2 + len_part3 + 1, len_part4)
-                    chars4.Font.Color = 0x000000  # Black
-                    chars4.Font.Bold = False
-                    chars4.Font.Underline = False
-                    # Quantity - Column F
-                    qty_value = requirement.get("Quantity", "")
-                    if qty_value:
-                        ws.Cells(req_row, 6).Value = str(qty_value)
-                    # Unit - Column G
-                    unit_value = requirement.get("Unit", "")
-                    if unit_value:
-                        ws.Cells(req_row, 7).Value = str(unit_value)
-                    # Unit price - Column H
-                    unit_price_value = requirement.get("Unit price", "")
-                    if unit_price_value:
-                        ws.Cells(req_row, 8).Value = str(unit_price_value)
-
-
-                # Delete leftover rows if less than max_rows filled
-                if num_filled < max_rows:
-                    delete_start = start_row + num_filled
-                    delete_end = start_row + max_rows - 1
+
+
+                # Delete leftover rows if less than MAX_ROWS filled
+                if num_filled < MAX_ROWS:
+                    delete_start = START_ROW + num_filled
+                    delete_end = START_ROW + MAX_ROWS - 1
                     ws.Rows(f"{delete_start}:{delete_end}").Delete()
 
                 # Add formulas for totals below the last filled requirement row
-                total_row = start_row + num_filled  # e.g., 12+50=62 for 50 items
+                total_row = START_ROW + num_filled  # e.g., 12+50=62 for 50 items
                 vat_row = total_row + 1
                 grand_total_row = total_row + 2
-                # I{total_row}: Total Amount (sum of I12:I{last})
-                ws.Cells(total_row, 9).Formula = f"=SUM(I{start_row}:I{total_row-1})"
-                # I{vat_row}: VAT 5%
-                ws.Cells(vat_row, 9).Formula = f"=I{total_row}*0.05"
-                # I{grand_total_row}: Grand Total
-                ws.Cells(grand_total_row, 9).Formula = f"=I{total_row}+I{vat_row}"
+                col = COL_TOTAL_LETTER
+                # Total Amount, VAT 5% and Grand Total written as one block
+                ws.Range(f"{col}{total_row}:{col}{grand_total_row}").Formula = (
+                    (f"=SUM({col}{START_ROW}:{col}{total_row - 1})",),
+                    (f"={col}{total_row}*0.05",),
+                    (f"={col}{total_row}+{col}{vat_row}",),
+                )
 
 
 
@@ -247,8 +667,126 @@ class ExcelGenerationService:
 
         except Exception as e:
             logger.error(f"Error filling template with win32com: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
+            # Re-raise so a half-filled workbook is neither saved nor cached
+            raise
+    
+    def analyze_template(self, verbose: bool = False, max_row: int = 30, max_col: int = 15) -> Optional[Dict]:
+        """
+        Analyze the Excel template structure (cell contents and merged ranges).
+        
+        This is a diagnostic and is not needed to generate quotations. Without
+        verbose only sheet names and dimensions are returned; the cell scan and
+        merged ranges are opt-in.
+        
+        The workbook is opened in openpyxl read-only mode from the cached template
+        bytes. Read-only worksheets do not expose merged cells, so those are read
+        from the sheet XML directly.
+        
+        Args:
+            verbose (bool): Include merged ranges and the cells with content
+            max_row (int): Last row to scan for content
+            max_col (int): Last column to scan for content
+            
+        Returns:
+            Optional[Dict]: Template structure per sheet, None if analysis failed
+        """
+        try:
+            template_bytes = _read_template(self.template_path)
+            
+            workbook = load_workbook(BytesIO(template_bytes), read_only=True, data_only=True, keep_links=False)
+            try:
+                with zipfile.ZipFile(BytesIO(template_bytes)) as archive:
+                    sheets = []
+                    for sheet in workbook.worksheets:
+                        # Files without a dimension record (e.g. write-only output) need a full pass to size
+                        dimensions = sheet.calculate_dimension(force=sheet.max_row is None)
+                        if not verbose:
+                            sheets.append({'name': sheet.title, 'dimensions': dimensions})
+                            continue
+                        
+                        merged_ranges = _read_merged_ranges(archive, sheet._worksheet_path)
+                        
+                        # (row, column) -> coord of the merged range covering it, built once per sheet
+                        merge_index = {}
+                        for merged_range in merged_ranges:
+                            range_coord = merged_range.coord
+                            for row_idx in range(merged_range.min_row, merged_range.max_row + 1):
+                                for col_idx in range(merged_range.min_col, merged_range.max_col + 1):
+                                    merge_index[(row_idx, col_idx)] = range_coord
+                        
+                        # Clamp to the sheet's used range so small sheets aren't padded with empty cells
+                        scan_rows = min(max_row, sheet.max_row)
+                        scan_cols = min(max_col, sheet.max_column)
+                        
+                        cells_with_content = []
+                        for row_idx, row in enumerate(
+                            sheet.iter_rows(min_row=1, max_row=scan_rows, max_col=scan_cols, values_only=True), start=1
+                        ):
+                            for col_idx, value in enumerate(row, start=1):
+                                if value is None:
+                                    continue
+                                cells_with_content.append({
+                                    'coordinate': f"{get_column_letter(col_idx)}{row_idx}",
+                                    'row': row_idx,
+                                    'column': col_idx,
+                                    'value': value,
+                                    'is_merged': (row_idx, col_idx) in merge_index,
+                                    'merged_range': merge_index.get((row_idx, col_idx))
+                                })
+                        
+                        sheets.append({
+                            'name': sheet.title,
+                            'dimensions': dimensions,
+                            'merged_cells': [merged_range.coord for merged_range in merged_ranges],
+                            'cells_with_content': cells_with_content
+                        })
+            finally:
+                # Read-only workbooks keep their source open until closed
+                workbook.close()
+            
+            return {
+                'template_path': self.template_path,
+                'sheets': sheets
+            }
+            
+        except Exception as e:
+            logger.error(f"Error analyzing template: {str(e)}")
+            return None
+    
+    def cleanup_old_files(self, max_age_hours: float = OUTPUT_MAX_AGE_HOURS) -> int:
+        """
+        Delete generated quotation files older than the given age.
+        
+        Args:
+            max_age_hours (float): Files last modified longer ago than this are deleted
+            
+        Returns:
+            int: Number of files deleted
+        """
+        cutoff = time.time() - max_age_hours * 3600
+        extensions = tuple(extension for _, extension, _ in OUTPUT_FORMATS.values())
+        deleted_count = 0
+        
+        try:
+            # scandir yields type and stat info from the directory read, avoiding a stat per name
+            with os.scandir(self.output_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(extensions) or not entry.is_file():
+                        continue
+                    try:
+                        if entry.stat().st_mtime < cutoff:
+                            os.unlink(entry.path)
+                            deleted_count += 1
+                    except FileNotFoundError:
+                        continue  # Removed concurrently
+            
+            if deleted_count:
+                logger.info(f"Deleted {deleted_count} old quotation files from {self.output_dir}")
+            return deleted_count
+            
+        except Exception as e:
+            logger.error(f"Error cleaning up old files: {str(e)}")
+            return deleted_count
     
     def get_file_info(self, file_path: str) -> Optional[Dict]:
         """
@@ -261,15 +799,17 @@ class ExcelGenerationService:
             Optional[Dict]: File information
         """
         try:
-            if not os.path.exists(file_path):
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
                 return None
             
-            stat = os.stat(file_path)
             return {
                 'filename': os.path.basename(file_path),
                 'full_path': os.path.abspath(file_path),
                 'size_bytes': stat.st_size,
-                'size_mb': round(stat.st_size / (1024 * 1024), 2),
+                # Integer rounding to 2 decimals (adds half a unit so it rounds, not truncates)
+                'size_mb': (stat.st_size * 100 + 512 * 1024) // (1024 * 1024) / 100,
                 'created': datetime.fromtimestamp(stat.st_ctime).isoformat(),
                 'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
             }
@@ -15,6 +15,15 @@ import uuid
 
 logger = logging.getLogger(__name__)
 
+# Patterns compiled once at import instead of being looked up on every call
+_EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_INVALID_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*]')
+_REPEATED_UNDERSCORES = re.compile(r'_+')
+_HTML_TAG = re.compile(r'<[^>]+>')
+_WHITESPACE_RUN = re.compile(r'\s+')
+_PHONE_SEPARATORS = re.compile(r'[\s\-\(\)\+\.]')
+_NUMBER = re.compile(r'-?\d+\.?\d*')
+
 def validate_email(email: str) -> bool:
     """
     Validate email address format.
@@ -35,8 +44,7 @@ def validate_email(email: str) -> bool:
         return False
     
     # Basic email regex pattern
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email.strip()))
+    return bool(_EMAIL_PATTERN.match(email.strip()))
 
 def sanitize_filename(filename: str) -> str:
     """
@@ -58,10 +66,10 @@ def sanitize_filename(filename: str) -> str:
         return "untitled"
     
     # Remove invalid characters
-    sanitized = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    sanitized = _INVALID_FILENAME_CHARS.sub('_', filename)
     
     # Replace multiple underscores with single underscore
-    sanitized = re.sub(r'_+', '_', sanitized)
+    sanitized = _REPEATED_UNDERSCORES.sub('_', sanitized)
     
     # Remove leading/trailing dots and spaces
     sanitized = sanitized.strip('. ')
@@ -209,7 +217,7 @@ def clean_html(html_content: str) -> str:
         return ""
     
     # Remove HTML tags
-    text = re.sub(r'<[^>]+>', '', html_content)
+    text = _HTML_TAG.sub('', html_content)
     
     # Convert common HTML entities
     text = text.replace('&amp;', '&')
@@ -220,7 +228,7 @@ def clean_html(html_content: str) -> str:
     text = text.replace('&nbsp;', ' ')
     
     # Clean up whitespace
-    text = re.sub(r'\s+', ' ', text)
+    text = _WHITESPACE_RUN.sub(' ', text)
     text = text.strip()
     
     return text
@@ -280,7 +288,7 @@ def validate_phone_number(phone: str) -> bool:
         return False
     
     # Remove common separators and spaces
-    cleaned = re.sub(r'[\s\-\(\)\+\.]', '', phone)
+    cleaned = _PHONE_SEPARATORS.sub('', phone)
     
     # Check if it contains only digits (with optional + prefix)
     if cleaned.startswith('+'):
@@ -303,8 +311,7 @@ def extract_numbers(text: str) -> List[float]:
         return []
     
     # Pattern to match integers and floats
-    pattern = r'-?\d+\.?\d*'
-    matches = re.findall(pattern, text)
+    matches = _NUMBER.findall(text)
     
     numbers = []
     for match in matches:
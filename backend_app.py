@@ -3,17 +3,24 @@ QuoteSnap - Gmail Email Monitor
 Simple Gmail monitoring application that prints new emails.
 """
 
+import atexit
+import base64
+import hmac
 import logging
+import logging.handlers
 import os
+import queue
 import threading
 import uuid
 from datetime import datetime
+from io import BytesIO
+import orjson
 from flask import Flask, jsonify, send_file, redirect, session, request
 from flask_cors import CORS
 from dotenv import load_dotenv
 from app.services.gmail_service import GmailService
 from app.services.duckdb_service import DuckDBService
-from app.services.new_excel_generation import ExcelGenerationService
+from app.services.new_excel_generation import ExcelGenerationService, OUTPUT_FORMATS
 from config.settings import Config
 
 # Load environment variables
@@ -25,12 +32,40 @@ monitoring_active = {}  # session_id -> bool
 
 logger = logging.getLogger(__name__)
 
+class _DropOldestQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that discards the oldest record instead of blocking when the queue is full."""
+
+    def enqueue(self, record):
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
 def setup_logging():
-    """Configure basic logging."""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    """
+    Configure logging with a write-behind queue.
+    
+    Request and monitoring threads only enqueue records; a single listener
+    thread formats and writes them to the console.
+    """
+    log_queue = queue.Queue(maxsize=10000)
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    queue_handler = _DropOldestQueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
 
 def create_flask_app():
     """Create and configure Flask application."""
@@ -246,34 +281,51 @@ def create_flask_app():
     @app.route('/api/emails', methods=['GET'])
     def get_all_emails():
         """
-        API endpoint to fetch all stored email extractions.
+        API endpoint to fetch stored email extractions, newest first.
+        
+        Query params:
+            limit: Page size (default and maximum 1000)
+            before: Cursor returned as next_cursor by the previous page
+            status: Optional extraction_status filter (VALID or IRRELEVANT)
+            summary: If true, return requirement_count instead of the full extraction_result
         
         Returns:
-            JSON response with all email extraction records
+            JSON response with a page of email extraction records
         """
         try:
+            limit = min(max(request.args.get('limit', 1000, type=int), 1), 1000)
+            before = request.args.get('before')
+            status = request.args.get('status')
+            summary = request.args.get('summary', 'false').lower() == 'true'
+            
+            if before and DuckDBService.parse_cursor(before) is None:
+                return jsonify({'error': 'Invalid before cursor'}), 400
+            
             db_service = DuckDBService()
             if not db_service.connect():
                 return jsonify({'error': 'Failed to connect to database'}), 500
             
             # Debug: Check if table exists and has data
-            try:
-                count_result = db_service.connection.execute('SELECT COUNT(*) FROM email_extractions').fetchone()
-                table_count = count_result[0] if count_result else 0
-                logging.info(f"Database has {table_count} records")
-            except Exception as e:
-                logging.error(f"Error checking table: {str(e)}")
-                return jsonify({'error': f'Database table error: {str(e)}'}), 500
+            table_count = db_service.count_extractions()
+            if table_count is None:
+                db_service.disconnect()
+                return jsonify({'error': 'Database table error: could not count email_extractions'}), 500
+            logging.info(f"Database has {table_count} records")
             
-            # Get all extractions (limit to 1000 for performance)
-            extractions = db_service.get_all_extractions(limit=1000)
+            extractions = db_service.get_all_extractions(
+                limit=limit, before=before, status=status, include_result=not summary
+            )
             db_service.disconnect()
             
+            # A full page means there may be more rows after it
+            next_cursor = DuckDBService.make_cursor(extractions[-1]) if len(extractions) == limit else None
+            
             return jsonify({
                 'success': True,
                 'count': len(extractions),
                 'table_count': table_count,
-                'data': extractions
+                'data': extractions,
+                'next_cursor': next_cursor
             })
             
         except Exception as e:
@@ -308,8 +360,7 @@ def create_flask_app():
                 schema = [{'column': row[0], 'type': row[1]} for row in schema_result]
                 
                 # Get count
-                count_result = db_service.connection.execute('SELECT COUNT(*) FROM email_extractions').fetchone()
-                count = count_result[0] if count_result else 0
+                count = db_service.count_extractions() or 0
                 
                 # Get sample data
                 if count > 0:
@@ -345,20 +396,15 @@ def create_flask_app():
             if not db_service.connect():
                 return jsonify({'error': 'Failed to connect to database'}), 500
             
-            # Get statistics
-            total_result = db_service.connection.execute('SELECT COUNT(*) FROM email_extractions').fetchone()
-            valid_result = db_service.connection.execute("SELECT COUNT(*) FROM email_extractions WHERE extraction_status = 'VALID'").fetchone()
-            irrelevant_result = db_service.connection.execute("SELECT COUNT(*) FROM email_extractions WHERE extraction_status = 'IRRELEVANT'").fetchone()
-            
+            stats = db_service.get_stats()
             db_service.disconnect()
             
+            if stats is None:
+                return jsonify({'error': 'Failed to read statistics'}), 500
+            
             return jsonify({
                 'success': True,
-                'stats': {
-                    'total_emails': total_result[0] if total_result else 0,
-                    'valid_quotations': valid_result[0] if valid_result else 0,
-                    'irrelevant_emails': irrelevant_result[0] if irrelevant_result else 0
-                }
+                'stats': stats
             })
             
         except Exception as e:
@@ -447,20 +493,16 @@ def create_flask_app():
             if not db_service.connect():
                 return jsonify({'success': False, 'error': 'Failed to connect to database'}), 500
             
-            # Get count before deletion
-            count_result = db_service.connection.execute('SELECT COUNT(*) FROM email_extractions').fetchone()
-            records_before = count_result[0] if count_result else 0
-            
-            # Delete all records
-            db_service.connection.execute('DELETE FROM email_extractions')
-            
-            # Verify deletion
-            count_result = db_service.connection.execute('SELECT COUNT(*) FROM email_extractions').fetchone()
-            records_after = count_result[0] if count_result else 0
-            
+            # Single DELETE; DuckDB reports how many rows it removed
+            deleted_count = db_service.clear_extractions()
             db_service.disconnect()
             
-            deleted_count = records_before - records_after
+            if deleted_count is None:
+                return jsonify({'success': False, 'error': 'Failed to clear database'}), 500
+            
+            # The DELETE is unconditional, so every row that existed was removed
+            records_before = deleted_count
+            records_after = 0
             
             logging.info(f"Database cleared: {deleted_count} records deleted")
             
@@ -476,6 +518,44 @@ def create_flask_app():
             logging.error(f"Database clear error: {str(e)}")
             return jsonify({'success': False, 'error': str(e)}), 500
     
+    @app.route('/api/gmail/push', methods=['POST'])
+    def gmail_push():
+        """
+        Cloud Pub/Sub push endpoint for Gmail mailbox change notifications.
+        
+        Wakes the monitoring loop of the matching mailbox so new emails are
+        processed immediately instead of at the next polling interval.
+        
+        Returns:
+            Empty response; any 2xx acknowledges the Pub/Sub message
+        """
+        # Without a configured token anyone could trigger mailbox syncs, so push stays off
+        if not Config.GMAIL_PUBSUB_VERIFICATION_TOKEN:
+            return jsonify({'error': 'Gmail push notifications are not configured'}), 404
+        
+        token = request.args.get('token', '')
+        if not hmac.compare_digest(token.encode(), Config.GMAIL_PUBSUB_VERIFICATION_TOKEN.encode()):
+            return jsonify({'error': 'Invalid token'}), 403
+        
+        try:
+            envelope = request.get_json(silent=True) or {}
+            data = envelope.get('message', {}).get('data', '')
+            notification = orjson.loads(base64.b64decode(data)) if data else {}
+            email_address = notification.get('emailAddress')
+            
+            notified = 0
+            for gmail_service in list(gmail_services.values()):
+                if gmail_service.monitoring_active and gmail_service.email_address == email_address:
+                    gmail_service.notify_mailbox_changed()
+                    notified += 1
+            
+            logging.info(f"Gmail push for {email_address} (historyId {notification.get('historyId')}), woke {notified} monitor(s)")
+        except Exception as e:
+            # Still acknowledged: a malformed message would otherwise be redelivered forever
+            logging.error(f"Gmail push handling error: {str(e)}")
+        
+        return '', 204
+    
     @app.route('/api/health', methods=['GET'])
     def health_check():
         """Health check endpoint."""
@@ -509,29 +589,28 @@ def create_flask_app():
                     'error': 'Cannot generate quotation for irrelevant email',
                     'status': extraction_data.get('extraction_status')
                 }), 400
-            # Generate Excel file on disk using new service
+            # Generate the workbook straight into memory; the download needs no disk copy
             excel_service = ExcelGenerationService()
-            output_file = excel_service.generate_quotation_excel(gmail_id, extraction_data)
-            if not output_file or not os.path.exists(output_file):
+            output_buffer = excel_service.generate_quotation_excel(
+                gmail_id, extraction_data, sink=BytesIO(), output_format=Config.QUOTATION_OUTPUT_FORMAT
+            )
+            if output_buffer is None:
                 return jsonify({'error': 'Failed to generate Excel file'}), 500
-
-            # Ensure the file is closed and saved before sending (important for win32com)
-            # (Already handled in service, but double-check)
-            import time
-            time.sleep(0.2)  # Small delay to ensure file system flush (esp. on Windows)
+            output_buffer.seek(0)
 
             # Create a descriptive filename for download
             subject = extraction_data.get('subject', 'quotation')[:30]  # Limit length
             clean_subject = "".join(c for c in subject if c.isalnum() or c in (' ', '-', '_')).rstrip()
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            download_filename = f"Quotation_{clean_subject}_{timestamp}.xlsx"
+            _, extension, mimetype = OUTPUT_FORMATS[excel_service.last_output_format]
+            download_filename = f"Quotation_{clean_subject}_{timestamp}{extension}"
 
-            # Open the file in binary mode and send as attachment (ensures no in-memory re-save)
+            # Send the generated bytes as attachment (no re-save)
             return send_file(
-                os.path.abspath(output_file),
+                output_buffer,
                 as_attachment=True,
                 download_name=download_filename,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                mimetype=mimetype,
                 max_age=0  # Prevent caching
             )
         except Exception as e:
@@ -556,27 +635,47 @@ def create_flask_app():
                 return jsonify({'error': 'File not found'}), 404
             
             # Validate filename to prevent directory traversal
-            if not filename.endswith('.xlsx') or '..' in filename:
+            extension = os.path.splitext(filename)[1].lstrip('.')
+            if extension not in OUTPUT_FORMATS or '..' in filename:
                 return jsonify({'error': 'Invalid filename'}), 400
             
             return send_file(
                 file_path,
                 as_attachment=True,
                 download_name=filename,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                mimetype=OUTPUT_FORMATS[extension][2]
             )
             
         except Exception as e:
             logging.error(f"File download error: {str(e)}")
             return jsonify({'error': str(e)}), 500
     
-    # The new ExcelGenerationService does not provide a template analysis method, so this endpoint is now deprecated or should be updated if needed.
     @app.route('/api/template/analyze', methods=['GET'])
     def analyze_template():
         """
-        (Deprecated) Analyze the Excel template structure. Not supported in new ExcelGenerationService.
+        Analyze the Excel template structure.
+        
+        Query params:
+            verbose: If false, return only sheet names and dimensions (default true)
+        
+        Returns:
+            JSON response with template cell contents and merged ranges
         """
-        return jsonify({'success': False, 'error': 'Template analysis not supported in new ExcelGenerationService.'}), 501
+        try:
+            verbose = request.args.get('verbose', 'true').lower() != 'false'
+            excel_service = ExcelGenerationService()
+            analysis = excel_service.analyze_template(verbose=verbose)
+            if analysis is None:
+                return jsonify({'success': False, 'error': 'Failed to analyze template'}), 500
+            
+            return jsonify({
+                'success': True,
+                'analysis': analysis
+            })
+            
+        except Exception as e:
+            logging.error(f"Template analysis error: {str(e)}")
+            return jsonify({'success': False, 'error': str(e)}), 500
     
     return app
 
@@ -592,7 +691,7 @@ def start_monitoring_loop(gmail_service):
         logging.info("📱 Monitoring active - new emails will be processed automatically")
         logging.info("=" * 60)
         
-        gmail_service.start_monitoring(Config.EMAIL_CHECK_INTERVAL)
+        gmail_service.start_monitoring(Config.EMAIL_CHECK_INTERVAL, push_topic=Config.GMAIL_PUBSUB_TOPIC)
         
     except Exception as e:
         logging.error(f"Email monitoring error: {str(e)}")
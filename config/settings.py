@@ -8,41 +8,6 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
-class Config:
-    """
-    Base configuration class with common settings.
-    """
-    
-    # Flask Configuration
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
-    DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
-    
-    # Gmail API Configuration
-    GMAIL_CREDENTIALS_FILE = os.environ.get('GMAIL_CREDENTIALS_FILE') or 'credentials.json'
-    GMAIL_TOKEN_FILE = os.environ.get('GMAIL_TOKEN_FILE') or 'token.json'
-    GMAIL_SCOPES = [
-        'https://www.googleapis.com/auth/gmail.readonly',
-        'https://www.googleapis.com/auth/gmail.modify'
-    ]
-    
-    # Email Monitoring Configuration
-    EMAIL_CHECK_INTERVAL = int(os.environ.get('EMAIL_CHECK_INTERVAL', '60'))
-    
-    @staticmethod
-    def validate_config():
-        """
-        Validate that all required configuration values are present.
-        """
-        # Only check if credentials file exists
-        if not os.path.exists(Config.GMAIL_CREDENTIALS_FILE):
-            raise ValueError(f"Gmail credentials file not found: {Config.GMAIL_CREDENTIALS_FILE}")
-
-import os
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-
 class Config:
     """
     Base configuration class with common settings.
@@ -69,6 +34,11 @@ class Config:
         'https://www.googleapis.com/auth/gmail.readonly',
         'https://www.googleapis.com/auth/gmail.modify'
     ]
+    # Optional Gmail push notifications: Pub/Sub topic Gmail publishes to, and the
+    # token the push subscription appends to /api/gmail/push?token=...
+    # (/api/gmail/push rejects every request while the token is unset)
+    GMAIL_PUBSUB_TOPIC = os.environ.get('GMAIL_PUBSUB_TOPIC')
+    GMAIL_PUBSUB_VERIFICATION_TOKEN = os.environ.get('GMAIL_PUBSUB_VERIFICATION_TOKEN')
     
     # OpenAI Configuration
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
@@ -88,6 +58,8 @@ class Config:
     
     # Excel Template Configuration
     EXCEL_TEMPLATE_PATH = os.environ.get('EXCEL_TEMPLATE_PATH') or 'templates/quotation_template.xlsx'
+    # xlsx (default) or xlsb; binary workbooks are smaller but not every mail client previews them
+    QUOTATION_OUTPUT_FORMAT = (os.environ.get('QUOTATION_OUTPUT_FORMAT') or 'xlsx').lower()
     
     @staticmethod
     def validate_config():
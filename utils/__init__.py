@@ -4,12 +4,26 @@ File processing utilities for SnapQuote.
 Main utility functions for processing different file types.
 """
 
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Tuple
+
 from .pdf_processor import pdf_to_markdown
 from .excel_processor import excel_to_markdown
 from .docx_processor import docx_to_markdown
 
 __all__ = ['pdf_to_markdown', 'excel_to_markdown', 'docx_to_markdown']
 
+logger = logging.getLogger(__name__)
+
+# Shared worker pool for CPU-bound attachment parsing (created on first use)
+_pool = None
+_pool_lock = threading.Lock()
+
 def process_attachment(filename: str, content: bytes) -> str:
     """
     Process an attachment based on its file type and return markdown content.
@@ -30,4 +44,63 @@ def process_attachment(filename: str, content: bytes) -> str:
     elif filename_lower.endswith(('.docx', '.doc')):
         return docx_to_markdown(content)
     else:
-        return f"# Unsupported File Type\n\nFile: {filename}\n\n*This file type is not supported for content extraction.*\n"
\ No newline at end of file
+        return f"# Unsupported File Type\n\nFile: {filename}\n\n*This file type is not supported for content extraction.*\n"
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Get the shared attachment processing pool, creating it on first use.
+    
+    Workers are spawned (not forked) since the app forks from a process
+    that already runs Flask and monitoring threads.
+    
+    Returns:
+        ProcessPoolExecutor: Shared process pool
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=min(4, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """
+    Drop a broken pool so the next call builds a fresh one.
+    
+    Args:
+        pool (ProcessPoolExecutor): Pool that raised BrokenProcessPool
+    """
+    global _pool
+    with _pool_lock:
+        # Another thread may already have replaced it
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def process_attachments(attachments: List[Tuple[str, bytes]]) -> List[str]:
+    """
+    Process several attachments in parallel and return their markdown content.
+    
+    Args:
+        attachments (List[Tuple[str, bytes]]): (filename, content) pairs
+        
+    Returns:
+        List[str]: Processed content in markdown format, in input order
+    """
+    if len(attachments) <= 1:
+        return [process_attachment(filename, content) for filename, content in attachments]
+    
+    filenames, contents = zip(*attachments)
+    pool = _get_pool()
+    try:
+        return list(pool.map(process_attachment, filenames, contents))
+    except BrokenProcessPool as e:
+        logger.warning(f"Attachment worker pool broke, recreating it and processing sequentially: {str(e)}")
+        _discard_pool(pool)
+        return [process_attachment(filename, content) for filename, content in attachments]
+    except Exception as e:
+        logger.warning(f"Parallel attachment processing failed, falling back to sequential: {str(e)}")
+        return [process_attachment(filename, content) for filename, content in attachments]